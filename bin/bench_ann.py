@@ -0,0 +1,82 @@
+"""Measure recall versus latency of the ANN index types on a synthetic corpus.
+
+Usage:
+    python bin/bench_ann.py [vector_count] [dimension]
+
+A clustered corpus (100k vectors of dimension 256 by default) and a set of
+held-out queries are generated, exact neighbours are computed with a flat index,
+and each index type and quantization is built with core.ann_index and swept over
+its search parameter (nprobe for IVF, efSearch for HNSW). Latency is measured
+one query at a time, as the chat page searches.
+"""
+import os
+import sys
+import time
+import faiss
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.ann_index import build_index, configure_search  # noqa: E402
+
+QUERY_COUNT = 200
+K = 10
+CONFIGURATIONS = [
+    ({"type": "flat", "quantization": "none"}, [None]),
+    ({"type": "hnsw", "quantization": "none"}, [16, 32, 64, 128]),
+    ({"type": "hnsw", "quantization": "sq8"}, [32, 64, 128]),
+    ({"type": "ivf", "quantization": "none"}, [1, 4, 16, 64]),
+    ({"type": "ivf", "quantization": "sq8"}, [4, 16, 64]),
+    ({"type": "ivf", "quantization": "pq"}, [4, 16, 64]),
+]
+
+
+def generate_corpus(count, dimension, clusters=200):
+    """Build clustered vectors, resembling embeddings of documents on a few hundred topics"""
+    rng = np.random.default_rng(42)
+    centers = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    assignments = rng.integers(0, clusters, size=count + QUERY_COUNT)
+    vectors = centers[assignments] + 0.5 * rng.normal(size=(count + QUERY_COUNT, dimension)).astype(np.float32)
+    return vectors[:count], vectors[count:]
+
+
+def measure(index, queries, truth):
+    """Return recall@K and mean per-query latency in milliseconds"""
+    found = []
+    start = time.perf_counter()
+    for query in queries:
+        _, indices = index.search(query.reshape(1, -1), K)
+        found.append(indices[0])
+    latency = (time.perf_counter() - start) / len(queries) * 1000
+    recall = np.mean([len(set(f) & set(t)) / K for f, t in zip(found, truth)])
+    return recall, latency
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    dimension = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+    vectors, queries = generate_corpus(count, dimension)
+    print(f"Synthetic corpus: {count} vectors, dimension {dimension}, {QUERY_COUNT} queries")
+
+    exact = faiss.IndexFlatL2(dimension)
+    exact.add(vectors)
+    _, truth = exact.search(queries, K)
+
+    print(f"{'index':<16} {'param':>6} {'build s':>8} {'size MB':>8} {'recall@10':>10} {'ms/query':>9}")
+    for settings, parameters in CONFIGURATIONS:
+        start = time.perf_counter()
+        index = build_index(vectors, settings)
+        build_time = time.perf_counter() - start
+        size = faiss.serialize_index(index).nbytes / 2 ** 20
+
+        label = f"{settings['type']}/{settings['quantization']}"
+        for parameter in parameters:
+            configure_search(index, nprobe=parameter, ef_search=parameter)
+            recall, latency = measure(index, queries, truth)
+            print(
+                f"{label:<16} {parameter or '-':>6} {build_time:>8.2f} {size:>8.1f} {recall:>10.3f} {latency:>9.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Measure conversation store latency with a large history.
+
+Usage:
+    python bin/bench_conversations.py [conversation_count ...]
+
+For each size (10k and 100k conversations by default) a store is filled in a
+temporary directory and the per-turn operations of the chat page are timed:
+saving an existing conversation, inserting a new one, loading one by id and
+listing one collection, plus appending one message to the SQLite message log. The previous TinyDB store is measured too when tinydb
+is installed.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from core.database import ConversationManager, DatabaseManager  # noqa: E402
+
+COLLECTIONS = [f"collection-{i}" for i in range(20)]
+OPERATIONS = 20
+
+
+def generate_conversations(count, turns=6):
+    """Build synthetic conversations spread over the collections"""
+    rng = random.Random(42)
+    conversations = []
+    for i in range(count):
+        history = []
+        for turn in range(turns):
+            history.append(["user", f"Question {turn} about topic {rng.randint(0, 1000)}?"])
+            history.append(["assistant", "Answer " + "lorem ipsum " * rng.randint(20, 80)])
+        conversations.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "title": f"Conversation {i}",
+            "chat_history": history,
+            "timestamp": f"2025-01-01T00:00:{i:09d}",
+            "collection_name": rng.choice(COLLECTIONS)
+        })
+    return conversations
+
+
+def timed(label, operation, repeat=OPERATIONS):
+    """Run an operation several times and print its mean latency"""
+    start = time.perf_counter()
+    for i in range(repeat):
+        operation(i)
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<28} {elapsed * 1000:>10.2f} ms")
+
+
+def bench_manager(manager, conversations):
+    """Time the chat page operations on a conversation manager"""
+    rng = random.Random(7)
+    existing = [rng.choice(conversations) for _ in range(OPERATIONS)]
+
+    timed("save (update)", lambda i: manager.save_conversation(
+        existing[i]["id"], existing[i]["title"], existing[i]["chat_history"] + [["user", "more"]],
+        existing[i]["collection_name"]
+    ))
+    timed("save (insert)", lambda i: manager.save_conversation(
+        str(uuid.uuid4()), "New conversation", [["user", "hello"]], COLLECTIONS[0]
+    ))
+    timed("load by id", lambda i: manager.load_conversation(existing[i]["id"]))
+    timed("list one collection", lambda i: manager.load_conversations_by_collection(COLLECTIONS[i % len(COLLECTIONS)]), repeat=5)
+
+
+def bench_sqlite(directory, conversations):
+    """Fill and benchmark the SQLite store"""
+    db_manager = DatabaseManager(os.path.join(directory, "conversations.db"), legacy_path=None)
+    with db_manager.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO conversations (id, title, timestamp, collection_name) VALUES (?, ?, ?, ?)",
+            [(c["id"], c["title"], c["timestamp"], c["collection_name"]) for c in conversations]
+        )
+        conn.executemany(
+            "INSERT INTO messages (conversation_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+            [(c["id"], role, content, c["timestamp"]) for c in conversations for role, content in c["chat_history"]]
+        )
+    print("SQLite (WAL)")
+    manager = ConversationManager(db_manager)
+    bench_manager(manager, conversations)
+    timed("append message", lambda i: manager.append_message(conversations[i]["id"], "user", "one more question"))
+    timed("load last 50 messages", lambda i: manager.load_messages(conversations[i]["id"], limit=50))
+
+
+def bench_tinydb(directory, conversations):
+    """Fill and benchmark the previous TinyDB store"""
+    try:
+        from tinydb import TinyDB, Query
+    except ImportError:
+        print("Skipping TinyDB: tinydb is not installed")
+        return
+
+    class TinyDBConversationManager:
+        """The TinyDB conversation operations as they were before the SQLite store"""
+
+        def __init__(self, path):
+            self.conversations = TinyDB(path, ensure_ascii=False).table("conversations")
+            self.Query = Query()
+
+        def save_conversation(self, conversation_id, title, chat_history, collection_name=None):
+            conversation = {"id": conversation_id, "title": title, "chat_history": chat_history,
+                            "timestamp": time.time(), "collection_name": collection_name}
+            if self.conversations.get(self.Query.id == conversation_id):
+                self.conversations.update(conversation, self.Query.id == conversation_id)
+            else:
+                self.conversations.insert(conversation)
+
+        def load_conversation(self, conversation_id):
+            return self.conversations.get(self.Query.id == conversation_id)
+
+        def load_conversations_by_collection(self, collection_name):
+            return self.conversations.search(self.Query.collection_name == collection_name)
+
+    manager = TinyDBConversationManager(os.path.join(directory, "conversations.json"))
+    manager.conversations.insert_multiple(conversations)
+    print("TinyDB")
+    bench_manager(manager, conversations)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    for size in sizes:
+        directory = tempfile.mkdtemp(prefix="bench_conversations_")
+        try:
+            conversations = generate_conversations(size)
+            print(f"\n{size} conversations")
+            bench_sqlite(directory, conversations)
+            bench_tinydb(directory, conversations)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare the native MarkdownLoader with the previous Unstructured-based loader.
+
+Usage:
+    python bin/bench_loader.py [collection_directory]
+
+Without a directory, a synthetic collection of markdown pages is generated in a
+temporary directory. The Unstructured loader is a dev dependency (``poetry install
+--with dev``); without it only the native loader is timed.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from services.document_service import MarkdownLoader  # noqa: E402
+
+WORDS = "index vector query collection document chunk embedding retriever config token".split()
+
+
+def generate_collection(directory, file_count=300, sections=12):
+    """Write synthetic markdown pages with headings, lists, links and code"""
+    rng = random.Random(42)
+    for i in range(file_count):
+        parts = [f"# Page {i}\n"]
+        for s in range(sections):
+            parts.append(f"## Section {s}\n")
+            parts.append(" ".join(rng.choice(WORDS) for _ in range(120)) + " [link](https://example.com) **bold**\n")
+            parts.append("- item one\n- item two\n")
+            parts.append("```python\ndef handler_%d():\n    return %d\n```\n" % (s, s))
+        with open(os.path.join(directory, f"{i}.md"), "w", encoding="utf-8") as f:
+            f.write("\n".join(parts))
+
+
+def timed(label, load):
+    """Run a loader once and print its wall time"""
+    start = time.perf_counter()
+    docs = load()
+    elapsed = time.perf_counter() - start
+    characters = sum(len(doc.page_content) for doc in docs)
+    print(f"{label:<28} {len(docs):>6} docs {characters:>12} chars {elapsed:>9.3f} s")
+    return elapsed
+
+
+def main():
+    if len(sys.argv) > 1:
+        directory = sys.argv[1]
+    else:
+        directory = tempfile.mkdtemp(prefix="bench_loader_")
+        generate_collection(directory)
+        print(f"Generated synthetic collection in {directory}")
+
+    native = timed("MarkdownLoader", lambda: MarkdownLoader().load_directory(directory))
+
+    try:
+        from langchain_community.document_loaders import DirectoryLoader, UnstructuredMarkdownLoader
+        legacy = timed(
+            "UnstructuredMarkdownLoader",
+            lambda: DirectoryLoader(directory, glob="**/*.md", loader_cls=UnstructuredMarkdownLoader).load()
+        )
+        print(f"Speedup: {legacy / native:.1f}x")
+    except Exception as e:
+        print(f"Skipping UnstructuredMarkdownLoader: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Build or update the persisted indexes of collections before the server takes traffic.
+
+Usage:
+    python bin/prewarm.py [collection ...]
+
+Without names, the collections listed in PREWARM_COLLECTIONS are warmed, or else
+the PREWARM_TOP_COLLECTIONS collections with the most conversations. Run it as a
+deploy step before `streamlit run`: the server then only memory-maps up-to-date
+indexes, and loads the same collections into memory in the background on its
+first page view. Exits with status 1 if any collection failed.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from services.document_service import DocumentService  # noqa: E402
+
+
+def main():
+    document_service = DocumentService()
+    names = sys.argv[1:] or None
+
+    start = time.perf_counter()
+    results = document_service.prewarm(names, keep_loaded=False)
+    if not results:
+        print("No collections to warm up (set PREWARM_COLLECTIONS or pass collection names)")
+        return 0
+
+    print(f"{'collection':<32} {'status':<8} {'seconds':>8} {'vectors':>9}")
+    for name, result in results.items():
+        if result["ready"]:
+            print(f"{name:<32} {'ready':<8} {result['seconds']:>8.2f} {result['vectors']:>9}")
+        else:
+            print(f"{name:<32} {'failed':<8} {result['seconds']:>8.2f} {'-':>9}  {result['error']}")
+
+    ready = sum(result["ready"] for result in results.values())
+    print(f"{ready}/{len(results)} collections ready in {time.perf_counter() - start:.2f}s")
+    return 0 if ready == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
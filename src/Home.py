@@ -1,9 +1,14 @@
 import streamlit as st
 import os
+import uuid
+from core.answer_cache import get_answer_cache
 from core.config import APP_CONFIG, PATHS
 from core.database import ConversationManager
+from core.registry import get_registry
+from components.chat import stream_markdown
 from services.ai_service import AIService
 from services.document_service import DocumentService
+from services.job_worker import start_worker_pool
 
 # Configuração da página
 st.set_page_config(
@@ -12,12 +17,26 @@ st.set_page_config(
     layout="wide"
 )
 
-# Inicializar serviços
-conversation_manager = ConversationManager()
-ai_service = AIService()
-document_service = DocumentService()
+# Serviços compartilhados pelo processo inteiro (todas as sessões e reruns)
+registry = get_registry()
+conversation_manager = registry.service("conversation_manager", ConversationManager)
+ai_service = registry.service("ai_service", lambda: AIService(conversation_manager))
+document_service = registry.service("document_service", DocumentService)
+answer_cache = get_answer_cache()
+
+# Pré-aquecer os índices das coleções mais usadas uma vez por processo, em segundo plano
+registry.service("index_prewarm", document_service.start_prewarm)
+
+# Retomar os jobs de scraping pendentes de antes de um reinício do servidor
+start_worker_pool()
+
+# Coleções disponíveis, lidas do catálogo uma vez por execução
+collections = document_service.get_available_rag_collections()
 
 # Inicializar estados da sessão
+if 'session_id' not in st.session_state:
+    # Identifica a sessão na fila de geração compartilhada
+    st.session_state.session_id = uuid.uuid4().hex
 if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 if 'current_conversation_id' not in st.session_state:
@@ -28,6 +47,12 @@ if 'first_message' not in st.session_state:
     st.session_state.first_message = True
 if 'selected_collection' not in st.session_state:
     st.session_state.selected_collection = None
+if 'extra_collections' not in st.session_state:
+    st.session_state.extra_collections = []
+if 'conversation_pages' not in st.session_state:
+    st.session_state.conversation_pages = 1
+if 'history_cursor' not in st.session_state:
+    st.session_state.history_cursor = None
 
 # Verificar chave da API
 openai_api_key = os.getenv("OPENAI_API_KEY")
@@ -45,14 +70,13 @@ with st.sidebar:
     
     # Se não houver coleção selecionada, mostrar seletor de coleção
     if not st.session_state.selected_collection:
-        # Obter coleções disponíveis
-        collections = document_service.get_available_rag_collections()
-        
         if collections:
             st.write("### Selecione uma coleção")
             for collection in collections:
                 if st.button(f"📁 {collection['name']}", key=f"select_{collection['name']}", use_container_width=True):
                     st.session_state.selected_collection = collection['name']
+                    st.session_state.extra_collections = []
+                    st.session_state.conversation_pages = 1
                     st.rerun()
         else:
             st.info("Nenhuma coleção disponível.")
@@ -65,6 +89,16 @@ with st.sidebar:
             st.session_state.selected_collection = None
             st.rerun()
         
+        # Coleções adicionais pesquisadas junto com a atual, sem criar um índice mesclado
+        other_collections = [
+            c["name"] for c in collections if c["name"] != st.session_state.selected_collection
+        ]
+        if other_collections:
+            st.session_state.extra_collections = [
+                name for name in st.session_state.extra_collections if name in other_collections
+            ]
+            st.multiselect("Pesquisar também em", other_collections, key="extra_collections")
+        
         st.divider()
         
         # Histórico de conversas
@@ -73,25 +107,41 @@ with st.sidebar:
         # Botão para nova conversa
         if st.button("+ Nova conversa", use_container_width=True):
             st.session_state.chat_history = []
+            st.session_state.history_cursor = None
             st.session_state.current_conversation_id = conversation_manager.generate_conversation_id()
             st.session_state.conversation_title = "Nova conversa"
             st.session_state.first_message = True
             st.rerun()
         
-        # Filtrar conversas por coleção
-        conversations = conversation_manager.load_all_conversations()
-        collection_conversations = [c for c in conversations if c.get('collection_name') == st.session_state.selected_collection]
+        # Conversas da coleção, carregadas uma página por vez
+        conversations = []
+        cursor = None
+        for _ in range(st.session_state.conversation_pages):
+            page, cursor = conversation_manager.list_conversations(
+                st.session_state.selected_collection,
+                limit=APP_CONFIG["conversation_page_size"],
+                cursor=cursor
+            )
+            conversations.extend(page)
+            if cursor is None:
+                break
         
-        if not collection_conversations:
+        if not conversations:
             st.info("Nenhuma conversa salva")
         else:
-            for conversation in collection_conversations:
+            for conversation in conversations:
                 cols = st.columns([5, 1])
                 with cols[0]:
                     if st.button(f"💬 {conversation['title']}", key=f"load_{conversation['id']}", use_container_width=True):
+                        # Carregar apenas as mensagens mais recentes; as anteriores sob demanda
+                        messages, history_cursor = conversation_manager.load_messages(
+                            conversation['id'],
+                            limit=APP_CONFIG["message_page_size"]
+                        )
                         st.session_state.current_conversation_id = conversation['id']
                         st.session_state.conversation_title = conversation['title']
-                        st.session_state.chat_history = conversation['chat_history']
+                        st.session_state.chat_history = [(m['role'], m['content']) for m in messages]
+                        st.session_state.history_cursor = history_cursor
                         st.session_state.first_message = False
                         st.rerun()
                 
@@ -100,10 +150,15 @@ with st.sidebar:
                         conversation_manager.delete_conversation(conversation['id'])
                         if conversation['id'] == st.session_state.current_conversation_id:
                             st.session_state.chat_history = []
+                            st.session_state.history_cursor = None
                             st.session_state.current_conversation_id = conversation_manager.generate_conversation_id()
                             st.session_state.conversation_title = "Nova conversa"
                             st.session_state.first_message = True
                         st.rerun()
+            
+            if cursor is not None and st.button("Carregar mais", use_container_width=True):
+                st.session_state.conversation_pages += 1
+                st.rerun()
 
 # Conteúdo principal
 if not st.session_state.selected_collection:
@@ -124,23 +179,38 @@ if not st.session_state.selected_collection:
 else:
     # Interface de chat quando uma coleção está selecionada
     
-    # Título da conversa
+    # Título da conversa (o gerado em segundo plano é lido do banco até ficar pronto)
+    if not st.session_state.first_message and st.session_state.conversation_title == "Nova conversa":
+        st.session_state.conversation_title = (
+            conversation_manager.get_conversation_title(st.session_state.current_conversation_id)
+            or st.session_state.conversation_title
+        )
     st.header(st.session_state.conversation_title)
     
     # Encontrar a coleção selecionada
-    collections = document_service.get_available_rag_collections()
     collection = next((c for c in collections if c["name"] == st.session_state.selected_collection), None)
     
     if collection:
-        # Carregar documentos e criar vector store
-        docs = document_service.load_documents_from_directory(collection["path"])
-        vector_store = document_service.create_vector_store(docs)
-        retriever = document_service.get_retriever(vector_store)
+        # Coleções pesquisadas: a selecionada e as adicionais
+        search_collections = [collection] + [
+            c for c in collections if c["name"] in st.session_state.extra_collections
+        ]
+        search_paths = [c["path"] for c in search_collections]
         
         # Container para mensagens do chat
         chat_container = st.container()
         
         with chat_container:
+            # Mensagens anteriores são carregadas uma página por vez
+            if st.session_state.history_cursor is not None and st.button("Carregar mensagens anteriores"):
+                messages, st.session_state.history_cursor = conversation_manager.load_messages(
+                    st.session_state.current_conversation_id,
+                    limit=APP_CONFIG["message_page_size"],
+                    before_id=st.session_state.history_cursor
+                )
+                st.session_state.chat_history = [(m['role'], m['content']) for m in messages] + st.session_state.chat_history
+                st.rerun()
+            
             # Exibir mensagens do histórico
             for role, message in st.session_state.chat_history:
                 with st.chat_message(role):
@@ -159,27 +229,24 @@ else:
             if st.session_state.first_message:
                 st.session_state.first_message = False
                 
-                # Salvar temporariamente
-                conversation_manager.save_conversation(
+                # Criar a conversa antes de gerar o título
+                conversation_manager.create_conversation(
                     st.session_state.current_conversation_id,
                     "Nova conversa",
-                    [],
                     st.session_state.selected_collection
                 )
                 
-                # Função de callback para atualizar o título
-                def update_title(title):
-                    conversation_manager.update_conversation_title(
-                        st.session_state.current_conversation_id,
-                        title
-                    )
-                    st.session_state.conversation_title = title
-                
-                # Iniciar processamento assíncrono do título
-                ai_service.process_title_async(user_message, update_title)
+                # O título é gerado em segundo plano e gravado no banco; os próximos reruns o leem
+                ai_service.request_title(st.session_state.current_conversation_id, user_message)
             
             # Adicionar mensagem do usuário ao histórico
             st.session_state.chat_history.append(("user", user_message))
+            conversation_manager.append_message(
+                st.session_state.current_conversation_id,
+                "user",
+                user_message,
+                st.session_state.selected_collection
+            )
             
             # Exibir mensagem do usuário na interface
             with st.chat_message("user"):
@@ -187,32 +254,64 @@ else:
             
             # Gerar resposta
             with st.chat_message("assistant"):
-                # Buscar documentos relevantes
-                relevant_docs = document_service.retrieve_relevant_documents(retriever, user_message)
+                # Perguntas de abertura (sem histórico) podem ser respondidas pelo cache de respostas
+                first_turn = len(st.session_state.chat_history) == 1
+                cache_key = "+".join(sorted(c["name"] for c in search_collections))
+                question_embedding = None
+                cached_answer = None
+                relevant_docs = None
+                # Cada coleção é carregada uma única vez por turno: a mesma versão serve ao cache e à busca
+                with document_service.hold_indexes(search_paths) as indexes:
+                    index_version = "+".join(indexes[path]["version"] for path in search_paths)
+                    if first_turn:
+                        if answer_cache.semantic:
+                            # Sem API de embeddings disponível, o cache ainda responde por correspondência exata
+                            try:
+                                question_embedding = document_service.embed_query(
+                                    user_message, timeout=APP_CONFIG["query_embedding_timeout"]
+                                )
+                            except Exception:
+                                question_embedding = None
+                        cached_answer = answer_cache.get(cache_key, index_version, user_message, question_embedding)
+                    
+                    if cached_answer is None:
+                        # Buscar documentos relevantes
+                        relevant_docs = [
+                            doc for doc, _ in document_service.search_collections(
+                                search_paths, user_message, indexes=indexes
+                            )
+                        ]
                 
-                # Criar prompt com contexto
-                prompt = ai_service.create_prompt_with_context(
-                    user_message, 
-                    st.session_state.chat_history[:-1],
-                    relevant_docs
-                )
+                if cached_answer is not None:
+                    response_stream = ai_service.replay_response(cached_answer)
+                else:
+                    # Criar prompt com contexto
+                    prompt = ai_service.create_prompt_with_context(
+                        user_message, 
+                        st.session_state.chat_history[:-1],
+                        relevant_docs,
+                        conversation_id=st.session_state.current_conversation_id
+                    )
+                    response_stream = ai_service.generate_streaming_response(
+                        prompt, user_id=st.session_state.session_id
+                    )
                 
                 # Gerar resposta em stream
+                # Atualizações em lote: o placeholder é redesenhado a cada ~50 ms, não a cada token
                 response_placeholder = st.empty()
-                response_text = ""
+                response_text, _ = stream_markdown(response_placeholder, response_stream)
                 
-                for chunk in ai_service.generate_streaming_response(prompt):
-                    response_text += chunk.content
-                    response_placeholder.markdown(response_text)
+                if first_turn and cached_answer is None and response_text:
+                    answer_cache.put(cache_key, index_version, user_message, response_text, question_embedding)
                 
                 # Adicionar resposta ao histórico
                 st.session_state.chat_history.append(("assistant", response_text))
             
-            # Salvar conversa
-            conversation_manager.save_conversation(
+            # Registrar a resposta no log de mensagens da conversa
+            conversation_manager.append_message(
                 st.session_state.current_conversation_id,
-                st.session_state.conversation_title,
-                st.session_state.chat_history,
+                "assistant",
+                response_text,
                 st.session_state.selected_collection
             )
             
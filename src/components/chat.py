@@ -1,9 +1,89 @@
 import streamlit as st
 from streamlit_js_eval import streamlit_js_eval
 import logging
+import time
+from core.config import APP_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# Shown at the end of the partial answer while tokens are still arriving
+STREAM_CURSOR = "▌"
+
+def stream_markdown(placeholder, chunks, interval=None, max_chars=None):
+    """
+    Render a stream of message chunks into a placeholder, batching the updates
+    
+    Re-rendering the whole answer on every token costs O(n²) in the answer length,
+    so tokens are buffered and the placeholder is only updated once `interval`
+    seconds have passed or `max_chars` new characters arrived, plus once at the end.
+    The stream is closed on exit, which cancels a generation left unfinished.
+    
+    Args:
+        placeholder: Streamlit element to render into (e.g. st.empty())
+        chunks: Iterable of message chunks with a `content` attribute
+        interval: Minimum seconds between renders (default: stream_render_interval)
+        max_chars: New characters that force a render (default: stream_render_chars)
+    
+    Returns:
+        Tuple of the complete text and a dict with time_to_first_token (seconds),
+        tokens, tokens_per_second and renders
+    """
+    interval = APP_CONFIG["stream_render_interval"] if interval is None else interval
+    max_chars = max_chars or APP_CONFIG["stream_render_chars"]
+    
+    parts = []
+    pending_chars = 0
+    tokens = 0
+    renders = 0
+    start = time.perf_counter()
+    first_token_at = None
+    last_render = start
+    
+    try:
+        for chunk in chunks:
+            content = chunk.content
+            now = time.perf_counter()
+            if content:
+                if first_token_at is None:
+                    first_token_at = now
+                parts.append(content)
+                tokens += 1
+                pending_chars += len(content)
+            
+            # Empty chunks (keep-alives while the request is queued) also render: each render
+            # lets Streamlit stop the run, and so cancel the generation, if the user left
+            if now - last_render >= interval or pending_chars >= max_chars:
+                placeholder.markdown("".join(parts) + STREAM_CURSOR)
+                renders += 1
+                last_render = now
+                pending_chars = 0
+    finally:
+        # Stop the generation now, not when the iterator is garbage collected: Streamlit's
+        # StopException keeps the iterator alive when the user navigates away
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+    
+    end = time.perf_counter()
+    text = "".join(parts)
+    placeholder.markdown(text)
+    renders += 1
+    
+    generation_time = end - first_token_at if first_token_at is not None else 0.0
+    stats = {
+        "time_to_first_token": first_token_at - start if first_token_at is not None else None,
+        "tokens": tokens,
+        "tokens_per_second": tokens / generation_time if generation_time > 0 else None,
+        "renders": renders
+    }
+    if first_token_at is not None:
+        logger.info(
+            f"Streamed {tokens} tokens in {renders} renders: "
+            f"first token after {stats['time_to_first_token'] * 1000:.0f} ms, "
+            f"{stats['tokens_per_second'] or 0:.1f} tokens/s"
+        )
+    return text, stats
+
 def render_chat_interface(chat_history, on_message_submit):
     """
     Render the chat interface with messages and input
@@ -61,13 +141,9 @@ def render_streaming_response(ai_service, prompt, callback=None):
         The complete response text
     """
     response_container = st.empty()
-    response_text = ""
     
     # Stream response
-    for chunk in ai_service.generate_streaming_response(prompt):
-        content_chunk = chunk.content
-        response_text += content_chunk
-        response_container.markdown(response_text)
+    response_text, _ = stream_markdown(response_container, ai_service.generate_streaming_response(prompt))
     
     # Add copy button
     col1, col2 = st.columns([0.95, 0.05])
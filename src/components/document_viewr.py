@@ -1,7 +1,9 @@
 import streamlit as st
 import os
 import logging
+from core.collection_catalog import CollectionCatalog
 from core.config import PATHS
+from core.registry import get_registry
 
 logger = logging.getLogger(__name__)
 
@@ -14,14 +16,14 @@ def render_document_viewer(collection_name=None):
     """
     st.subheader("📄 Visualizador de documentos")
     
-    # Get all directories in the RAG folder
+    # Collections come from the catalog; only the selected one is listed below
     rag_dir = PATHS["rag_directory"]
     if not os.path.exists(rag_dir):
         st.info("Diretório RAG não encontrado.")
         return
     
-    collections = [d for d in os.listdir(rag_dir) 
-                 if os.path.isdir(os.path.join(rag_dir, d))]
+    catalog = get_registry().service("collection_catalog", CollectionCatalog)
+    collections = [c["name"] for c in catalog.list_collections(include_empty=True)]
     
     if not collections:
         st.info("Nenhuma coleção disponível para visualização.")
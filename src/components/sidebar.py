@@ -1,5 +1,6 @@
 import streamlit as st
 import logging
+from core.config import APP_CONFIG
 
 logger = logging.getLogger(__name__)
 
@@ -35,13 +36,26 @@ def render_conversation_sidebar(conversation_manager, collections=None):
         # Button for new conversation
         if st.button("+ Nova conversa", use_container_width=True):
             st.session_state.chat_history = []
+            st.session_state.history_cursor = None
             st.session_state.current_conversation_id = conversation_manager.generate_conversation_id()
             st.session_state.conversation_title = "Nova conversa"
             st.session_state.first_message = True
             st.rerun()
         
-        # Load conversations
-        conversations = conversation_manager.load_all_conversations()
+        # Load one page of conversations at a time for the selected collection
+        page_size = APP_CONFIG["conversation_page_size"]
+        pages = st.session_state.get("conversation_pages", 1)
+        conversations = []
+        cursor = None
+        for _ in range(pages):
+            page, cursor = conversation_manager.list_conversations(
+                st.session_state.get("selected_collection"),
+                limit=page_size,
+                cursor=cursor
+            )
+            conversations.extend(page)
+            if cursor is None:
+                break
         
         if not conversations:
             st.info("Nenhuma conversa salva.")
@@ -54,9 +68,15 @@ def render_conversation_sidebar(conversation_manager, collections=None):
                     if st.button(f"💬 {conversation['title']}", 
                                key=f"load_{conversation['id']}", 
                                use_container_width=True):
+                        # Load only the latest messages; earlier ones are paged in on demand
+                        messages, history_cursor = conversation_manager.load_messages(
+                            conversation['id'],
+                            limit=APP_CONFIG["message_page_size"]
+                        )
                         st.session_state.current_conversation_id = conversation['id']
                         st.session_state.conversation_title = conversation['title']
-                        st.session_state.chat_history = conversation['chat_history']
+                        st.session_state.chat_history = [(m['role'], m['content']) for m in messages]
+                        st.session_state.history_cursor = history_cursor
                         st.session_state.first_message = False
                         st.rerun()
                 
@@ -67,8 +87,13 @@ def render_conversation_sidebar(conversation_manager, collections=None):
                         # If the deleted conversation is the current one, reset the state
                         if conversation['id'] == st.session_state.current_conversation_id:
                             st.session_state.chat_history = []
+                            st.session_state.history_cursor = None
                             st.session_state.current_conversation_id = conversation_manager.generate_conversation_id()
                             st.session_state.conversation_title = "Nova conversa"
                             st.session_state.first_message = True
                         
-                        st.rerun()
\ No newline at end of file
+                        st.rerun()
+            
+            if cursor is not None and st.button("Carregar mais", use_container_width=True):
+                st.session_state.conversation_pages = pages + 1
+                st.rerun()
@@ -0,0 +1,124 @@
+import logging
+import math
+import faiss
+import numpy as np
+from core.config import APP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+QUANTIZATIONS = ("none", "sq8", "pq")
+FLAT_SETTINGS = {"type": "flat", "quantization": "none"}
+
+# IVF and PQ train on at most this many vectors
+TRAINING_SAMPLE_SIZE = 100000
+# Fewer training points per IVF list than this gives poor centroids
+MIN_POINTS_PER_LIST = 39
+# 8-bit PQ codebooks need at least 2^8 training vectors
+PQ_MIN_TRAINING_VECTORS = 256
+
+
+def select_index_settings(vector_count):
+    """Choose the index type and quantization for a collection of vector_count vectors
+    
+    With ann_index_type "auto", small collections get an exact flat index, larger
+    ones HNSW and the largest IVF. Quantization only applies to HNSW and IVF.
+    """
+    index_type = APP_CONFIG["ann_index_type"]
+    if index_type == "auto":
+        if vector_count <= APP_CONFIG["ann_flat_max_vectors"]:
+            index_type = "flat"
+        elif vector_count <= APP_CONFIG["ann_hnsw_max_vectors"]:
+            index_type = "hnsw"
+        else:
+            index_type = "ivf"
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown ANN index type: {index_type}")
+    
+    quantization = APP_CONFIG["ann_quantization"]
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown ANN quantization: {quantization}")
+    if index_type == "flat":
+        quantization = "none"
+    return {"type": index_type, "quantization": quantization}
+
+
+def pq_subquantizers(dimension, requested=None):
+    """Largest number of PQ sub-quantizers up to the requested one that divides the dimension"""
+    requested = requested or APP_CONFIG["ann_pq_m"]
+    return next(m for m in range(min(requested, dimension), 0, -1) if dimension % m == 0)
+
+
+def ivf_list_count(vector_count, requested=None):
+    """Number of IVF lists: configured, or about 4 * sqrt(n), bounded by the training data"""
+    nlist = requested or APP_CONFIG["ann_nlist"] or int(4 * math.sqrt(vector_count))
+    return max(1, min(nlist, vector_count // MIN_POINTS_PER_LIST))
+
+
+def factory_key(settings, dimension, vector_count):
+    """Return the faiss index_factory description for the given settings"""
+    quantization = settings["quantization"]
+    if quantization == "pq" and vector_count < PQ_MIN_TRAINING_VECTORS:
+        logger.info(f"Too few vectors ({vector_count}) to train PQ, using SQ8 instead")
+        quantization = "sq8"
+    
+    encoding = {
+        "none": "Flat",
+        "sq8": "SQ8",
+        "pq": f"PQ{pq_subquantizers(dimension)}"
+    }[quantization]
+    
+    if settings["type"] == "flat":
+        return encoding
+    if settings["type"] == "hnsw":
+        m = APP_CONFIG["ann_hnsw_m"]
+        return f"HNSW{m}" if quantization == "none" else f"HNSW{m}_{encoding}"
+    return f"IVF{ivf_list_count(vector_count)},{encoding}"
+
+
+def configure_search(index, nprobe=None, ef_search=None):
+    """Apply the query-time parameters (IVF nprobe, HNSW efSearch) to an index"""
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = nprobe or APP_CONFIG["ann_nprobe"]
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = ef_search or APP_CONFIG["ann_ef_search"]
+    return index
+
+
+def build_index(vectors, settings, dimension=None):
+    """Build, train and fill a faiss index (L2 metric) over an (n, d) array of vectors"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, dimension or np.shape(vectors)[-1])
+    count, dimension = vectors.shape
+    key = factory_key(settings, dimension, count)
+    index = faiss.index_factory(dimension, key, faiss.METRIC_L2)
+    
+    hnsw = getattr(index, "hnsw", None)
+    if hnsw is not None:
+        hnsw.efConstruction = APP_CONFIG["ann_ef_construction"]
+    
+    if not index.is_trained:
+        sample = vectors
+        if count > TRAINING_SAMPLE_SIZE:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(count, TRAINING_SAMPLE_SIZE, replace=False)]
+        index.train(sample)
+    
+    index.add(vectors)
+    logger.info(f"Built {key} index with {count} vectors")
+    return configure_search(index)
+
+
+def supports_removal(index):
+    """Whether removing vectors keeps positions contiguous, as the LangChain FAISS store expects"""
+    # Flat-code indexes compact on removal; IVF keeps the old ids and HNSW cannot remove at all
+    return isinstance(index, faiss.IndexFlatCodes)
+
+
+def stored_vectors(index):
+    """Return the exact vectors held by an index in position order, or None if it only keeps quantized codes"""
+    if isinstance(index, faiss.IndexIVFFlat):
+        index.make_direct_map()
+    elif not isinstance(index, (faiss.IndexFlat, faiss.IndexHNSWFlat)):
+        return None
+    return index.reconstruct_n(0, index.ntotal)
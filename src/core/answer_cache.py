@@ -0,0 +1,179 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+from core.config import APP_CONFIG, PATHS
+
+logger = logging.getLogger(__name__)
+
+TRAILING_PUNCTUATION_PATTERN = re.compile(r'[\s?!.;:]+$')
+
+_cache_instance = None
+_cache_instance_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Get the answer cache shared by the whole process"""
+    global _cache_instance
+    with _cache_instance_lock:
+        if _cache_instance is None:
+            _cache_instance = AnswerCache()
+        return _cache_instance
+
+
+def normalize_question(question):
+    """Normalize a question so trivially different phrasings share a cache entry"""
+    question = " ".join(question.lower().split())
+    return TRAILING_PUNCTUATION_PATTERN.sub("", question)
+
+
+class AnswerCache:
+    """Answers to questions per collection index version, with TTL and LRU eviction, stored in SQLite
+    
+    Entries are keyed by collection, index version and normalized question, so a
+    rebuilt index (new version) never serves answers generated from the old one.
+    With a similarity threshold, a question that misses the exact key is matched
+    against the embeddings of the cached questions of the same index version.
+    """
+    
+    def __init__(self, db_path=PATHS["answer_cache"], max_entries=None, ttl=None, similarity_threshold=None):
+        """Open (or create) the cache database"""
+        self.db_path = db_path
+        self.max_entries = max_entries or APP_CONFIG["answer_cache_max_entries"]
+        self.ttl = APP_CONFIG["answer_cache_ttl"] if ttl is None else ttl
+        self.similarity_threshold = (
+            APP_CONFIG["answer_cache_similarity"] if similarity_threshold is None else similarity_threshold
+        )
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                collection TEXT NOT NULL,
+                index_version TEXT NOT NULL,
+                question_hash TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                embedding BLOB,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (collection, index_version, question_hash)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_last_used ON answers (last_used)")
+        self.conn.commit()
+        logger.info(f"Answer cache initialized at {db_path}")
+    
+    @property
+    def semantic(self):
+        """Whether near-duplicate questions are matched by embedding similarity"""
+        return self.similarity_threshold > 0
+    
+    @staticmethod
+    def question_hash(question):
+        """Hash a question after normalizing it"""
+        return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()
+    
+    def get(self, collection, index_version, question, embedding=None):
+        """Return the cached answer for a question, or None"""
+        now = time.time()
+        question_hash = self.question_hash(question)
+        
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT question_hash, answer FROM answers "
+                "WHERE collection = ? AND index_version = ? AND question_hash = ? AND created_at >= ?",
+                (collection, index_version, question_hash, now - self.ttl)
+            ).fetchone()
+            
+            if row is None and embedding is not None and self.semantic:
+                row = self._nearest(collection, index_version, embedding, now)
+            
+            if row is None:
+                self.misses += 1
+                return None
+            
+            self.conn.execute(
+                "UPDATE answers SET last_used = ? WHERE collection = ? AND index_version = ? AND question_hash = ?",
+                (now, collection, index_version, row[0])
+            )
+            self.conn.commit()
+            self.hits += 1
+            return row[1]
+    
+    def _nearest(self, collection, index_version, embedding, now):
+        """Find the cached question most similar to an embedding, above the threshold"""
+        rows = self.conn.execute(
+            "SELECT question_hash, answer, embedding FROM answers "
+            "WHERE collection = ? AND index_version = ? AND embedding IS NOT NULL AND created_at >= ?",
+            (collection, index_version, now - self.ttl)
+        ).fetchall()
+        if not rows:
+            return None
+        
+        matrix = np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows])
+        similarities = matrix @ self._unit(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        
+        logger.debug(f"Answer cache semantic hit with similarity {similarities[best]:.3f}")
+        return rows[best][0], rows[best][1]
+    
+    @staticmethod
+    def _unit(vector):
+        """Normalize a vector to unit length as float32"""
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def put(self, collection, index_version, question, answer, embedding=None):
+        """Store an answer, dropping entries of older index versions and beyond the size limit"""
+        now = time.time()
+        blob = self._unit(embedding).tobytes() if embedding is not None else None
+        
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO answers "
+                "(collection, index_version, question_hash, question, answer, embedding, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (collection, index_version, self.question_hash(question), question, answer, blob, now, now)
+            )
+            
+            # Answers generated from a previous index of the collection can no longer be served
+            self.conn.execute(
+                "DELETE FROM answers WHERE collection = ? AND index_version != ?",
+                (collection, index_version)
+            )
+            self.conn.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,))
+            
+            entries = self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+            if entries > self.max_entries:
+                self.conn.execute(
+                    "DELETE FROM answers WHERE rowid IN "
+                    "(SELECT rowid FROM answers ORDER BY last_used LIMIT ?)",
+                    (entries - self.max_entries,)
+                )
+            self.conn.commit()
+    
+    def invalidate(self, collection):
+        """Drop every cached answer of a collection"""
+        with self._lock:
+            self.conn.execute("DELETE FROM answers WHERE collection = ?", (collection,))
+            self.conn.commit()
+    
+    def stats(self):
+        """Return hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
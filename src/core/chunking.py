@@ -0,0 +1,162 @@
+import logging
+import re
+import tiktoken
+from langchain_core.documents import Document
+from core.config import APP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})[ \t]+(.+?)[ \t#]*$')
+FENCE_PATTERN = re.compile(r'^[ \t]*(```|~~~)')
+PARAGRAPH_BREAK_PATTERN = re.compile(r'\n[ \t]*\n')
+
+
+def get_encoding(model_name=None):
+    """Get the tiktoken encoding used by a model, falling back to cl100k_base"""
+    try:
+        return tiktoken.encoding_for_model(model_name or APP_CONFIG["embedding_model"])
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+class MarkdownChunker:
+    """Split markdown documents into heading-aware chunks bounded by a token budget"""
+    
+    def __init__(self, chunk_size=None, chunk_overlap=None, model_name=None):
+        """Initialize the chunker with sizes in tokens of the embedding model"""
+        self.chunk_size = chunk_size or APP_CONFIG["chunk_size"]
+        self.chunk_overlap = APP_CONFIG["chunk_overlap"] if chunk_overlap is None else chunk_overlap
+        if self.chunk_overlap >= self.chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.encoding = get_encoding(model_name)
+    
+    def count_tokens(self, text):
+        """Count the tokens of a text"""
+        return len(self.encoding.encode(text, disallowed_special=()))
+    
+    def split_documents(self, documents):
+        """Split documents into chunks, keeping each document's metadata"""
+        chunks = []
+        for document in documents:
+            chunks.extend(self.split_text(document.page_content, document.metadata))
+        return chunks
+    
+    def split_text(self, text, metadata=None):
+        """Split a markdown text into chunks annotated with heading path and character offsets"""
+        metadata = metadata or {}
+        chunks = []
+        
+        for heading_path, section_start, section_end in self._sections(text):
+            for start, end, token_count in self._pack(text, section_start, section_end):
+                # Trim surrounding whitespace while keeping offsets exact
+                content = text[start:end]
+                start += len(content) - len(content.lstrip())
+                end -= len(content) - len(content.rstrip())
+                if start >= end:
+                    continue
+                
+                chunks.append(Document(
+                    page_content=text[start:end],
+                    metadata={
+                        **metadata,
+                        "heading_path": heading_path,
+                        "start_index": start,
+                        "end_index": end,
+                        "chunk_index": len(chunks),
+                        "token_count": token_count
+                    }
+                ))
+        
+        return chunks
+    
+    def _sections(self, text):
+        """Yield (heading_path, start, end) for each heading-delimited section of a text"""
+        headings = []
+        section_start = 0
+        section_path = []
+        in_fence = False
+        offset = 0
+        
+        for line in text.splitlines(keepends=True):
+            line_start = offset
+            offset += len(line)
+            
+            if FENCE_PATTERN.match(line):
+                in_fence = not in_fence
+                continue
+            
+            match = None if in_fence else HEADING_PATTERN.match(line.rstrip("\r\n"))
+            if not match:
+                continue
+            
+            if line_start > section_start:
+                yield section_path, section_start, line_start
+            
+            level = len(match.group(1))
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, match.group(2).strip()))
+            
+            section_start = line_start
+            section_path = [title for _, title in headings]
+        
+        if len(text) > section_start:
+            yield section_path, section_start, len(text)
+    
+    def _pack(self, text, start, end):
+        """Yield (start, end, token_count) chunks packing whole paragraphs of a section"""
+        current = []
+        current_tokens = 0
+        
+        for paragraph_start, paragraph_end in self._paragraphs(text, start, end):
+            tokens = self.count_tokens(text[paragraph_start:paragraph_end])
+            
+            # Paragraphs larger than a chunk are cut into overlapping token windows
+            if tokens > self.chunk_size:
+                if current:
+                    yield current[0][0], current[-1][1], current_tokens
+                    current, current_tokens = [], 0
+                yield from self._windows(text, paragraph_start, paragraph_end)
+                continue
+            
+            if current and current_tokens + tokens > self.chunk_size:
+                yield current[0][0], current[-1][1], current_tokens
+                
+                # Carry trailing paragraphs over as overlap with the next chunk
+                carried = []
+                carried_tokens = 0
+                for unit in reversed(current):
+                    if carried_tokens + unit[2] > self.chunk_overlap or carried_tokens + unit[2] + tokens > self.chunk_size:
+                        break
+                    carried.insert(0, unit)
+                    carried_tokens += unit[2]
+                current, current_tokens = carried, carried_tokens
+            
+            current.append((paragraph_start, paragraph_end, tokens))
+            current_tokens += tokens
+        
+        if current:
+            yield current[0][0], current[-1][1], current_tokens
+    
+    def _paragraphs(self, text, start, end):
+        """Yield (start, end) spans of the blank-line separated paragraphs in a range"""
+        position = start
+        for match in PARAGRAPH_BREAK_PATTERN.finditer(text, start, end):
+            if match.start() > position:
+                yield position, match.start()
+            position = match.end()
+        if end > position:
+            yield position, end
+    
+    def _windows(self, text, start, end):
+        """Yield overlapping token windows over a range that does not fit in one chunk"""
+        tokens = self.encoding.encode(text[start:end], disallowed_special=())
+        _, offsets = self.encoding.decode_with_offsets(tokens)
+        stride = self.chunk_size - self.chunk_overlap
+        
+        for window_start in range(0, len(tokens), stride):
+            window_end = min(window_start + self.chunk_size, len(tokens))
+            char_end = offsets[window_end] if window_end < len(tokens) else end - start
+            yield start + offsets[window_start], start + char_end, window_end - window_start
+            if window_end == len(tokens):
+                break
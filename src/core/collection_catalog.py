@@ -0,0 +1,135 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from core.config import APP_CONFIG, PATHS
+from core.database import DatabaseManager
+from core.index_store import IndexStore
+
+logger = logging.getLogger(__name__)
+
+
+class CollectionCatalog:
+    """Persistent catalog of the collections under the RAG directory, stored in SQLite
+    
+    Each collection row keeps its file count, byte size, index version and the
+    time its newest file was modified. Reading the catalog does not list any
+    directory: a sync compares each collection directory's mtime with the one
+    recorded at its last scan and rescans only the directories that changed (a
+    file added, removed or replaced), at most once every catalog_check_interval
+    seconds. The scrape and index pipelines also refresh their collection
+    explicitly, which covers files rewritten in place.
+    """
+    
+    def __init__(self, db_manager=None, rag_directory=PATHS["rag_directory"]):
+        """Initialize the catalog over a RAG directory"""
+        self.db_manager = db_manager or DatabaseManager()
+        self.rag_directory = rag_directory
+        self._last_sync = 0.0
+        self._sync_lock = threading.Lock()
+    
+    def list_collections(self, include_empty=False):
+        """Return the catalogued collections sorted by name, by default only those with markdown files"""
+        self.sync()
+        rows = self.db_manager.query(
+            "SELECT * FROM collections WHERE file_count > 0 OR ? ORDER BY name",
+            (include_empty,)
+        )
+        return [self._row_to_collection(row) for row in rows]
+    
+    def get_collection(self, name):
+        """Return one collection by name, or None"""
+        self.sync()
+        row = self.db_manager.query_one("SELECT * FROM collections WHERE name = ?", (name,))
+        return self._row_to_collection(row) if row else None
+    
+    @staticmethod
+    def _row_to_collection(row):
+        """Convert a catalog row to the collection dictionary used by the pages"""
+        return {
+            "name": row["name"],
+            "path": row["path"],
+            "file_count": row["file_count"],
+            "total_bytes": row["total_bytes"],
+            "index_version": row["index_version"],
+            "modified_at": row["modified_at"]
+        }
+    
+    def sync(self, force=False):
+        """Rescan the collections whose directory changed since they were catalogued"""
+        with self._sync_lock:
+            now = time.monotonic()
+            if not force and now - self._last_sync < APP_CONFIG["catalog_check_interval"]:
+                return
+            self._last_sync = now
+            
+            if not os.path.isdir(self.rag_directory):
+                os.makedirs(self.rag_directory, exist_ok=True)
+                logger.info(f"Created RAG directory: {self.rag_directory}")
+            
+            recorded = {
+                row["name"]: row["dir_mtime_ns"]
+                for row in self.db_manager.query("SELECT name, dir_mtime_ns FROM collections")
+            }
+            present = set()
+            with os.scandir(self.rag_directory) as entries:
+                for entry in entries:
+                    if not entry.is_dir() or entry.name.startswith("."):
+                        continue
+                    present.add(entry.name)
+                    if recorded.get(entry.name) != entry.stat().st_mtime_ns:
+                        self.refresh(entry.name)
+            
+            for name in recorded.keys() - present:
+                self.remove(name)
+    
+    def refresh(self, name, index_version=None):
+        """Rescan one collection directory and store its entry, keeping the index version unless given"""
+        path = os.path.join(self.rag_directory, name)
+        try:
+            dir_mtime_ns = os.stat(path).st_mtime_ns
+            # The same files the collection's index is built from
+            files = IndexStore(path).scan_files()
+        except FileNotFoundError:
+            self.remove(name)
+            return
+        
+        file_count = len(files)
+        total_bytes = sum(file["size"] for file in files.values())
+        newest = max((file["mtime_ns"] for file in files.values()), default=0) / 1e9
+        
+        self.db_manager.execute(
+            "INSERT INTO collections "
+            "(name, path, file_count, total_bytes, index_version, dir_mtime_ns, modified_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET "
+            "path = excluded.path, file_count = excluded.file_count, total_bytes = excluded.total_bytes, "
+            "index_version = COALESCE(excluded.index_version, collections.index_version), "
+            "dir_mtime_ns = excluded.dir_mtime_ns, modified_at = excluded.modified_at, "
+            "updated_at = excluded.updated_at",
+            (
+                name,
+                path,
+                file_count,
+                total_bytes,
+                index_version,
+                dir_mtime_ns,
+                datetime.fromtimestamp(newest).isoformat() if newest else None,
+                datetime.now().isoformat()
+            )
+        )
+        logger.debug(f"Catalogued collection {name}: {file_count} files, {total_bytes} bytes")
+    
+    def set_index_version(self, name, index_version):
+        """Record the version of a collection's index after it was loaded or rebuilt"""
+        updated = self.db_manager.execute(
+            "UPDATE collections SET index_version = ?, updated_at = ? WHERE name = ?",
+            (index_version, datetime.now().isoformat(), name)
+        )
+        if not updated:
+            self.refresh(name, index_version)
+    
+    def remove(self, name):
+        """Drop a collection from the catalog"""
+        self.db_manager.execute("DELETE FROM collections WHERE name = ?", (name,))
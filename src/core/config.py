@@ -6,12 +6,18 @@ from pathlib import Path
 # Carregar variáveis de ambiente
 load_dotenv()
 
+# Diretório base dos dados (src/): os caminhos não dependem do diretório de trabalho,
+# então o app, o worker de jobs e os scripts de bin/ usam os mesmos arquivos
+BASE_DIRECTORY = Path(__file__).resolve().parent.parent
+
 # Criar diretórios necessários
 def create_directories():
     """Criar todos os diretórios necessários para a aplicação"""
     directories = [
-        Path("data/conversations"),
-        Path("data/rag")
+        BASE_DIRECTORY / "data/conversations",
+        BASE_DIRECTORY / "data/rag",
+        BASE_DIRECTORY / "data/cache",
+        BASE_DIRECTORY / "data/jobs"
     ]
     
     for directory in directories:
@@ -23,7 +29,7 @@ logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     handlers=[
         logging.StreamHandler(),
-        logging.FileHandler("app.log")
+        logging.FileHandler(BASE_DIRECTORY / "app.log")
     ]
 )
 
@@ -34,19 +40,83 @@ APP_CONFIG = {
     "app_name": "Docstóteles",
     "app_icon": "📚",
     "openai_api_key": os.getenv("OPENAI_API_KEY", ""),
+    "openai_base_url": os.getenv("OPENAI_BASE_URL", ""),
     "default_model": os.getenv("DEFAULT_MODEL", "gpt-4o-mini"),
     "title_model": os.getenv("TITLE_MODEL", "gpt-4o-mini"),
     "temperature": float(os.getenv("TEMPERATURE", "0.4")),
     "title_temperature": float(os.getenv("TITLE_TEMPERATURE", "0.2")),
+    "title_workers": int(os.getenv("TITLE_WORKERS", "2")),
+    "title_batch_size": int(os.getenv("TITLE_BATCH_SIZE", "8")),
+    "title_max_pending": int(os.getenv("TITLE_MAX_PENDING", "32")),
     "retriever_k": int(os.getenv("RETRIEVER_K", "5")),
+    "retrieval_mode": os.getenv("RETRIEVAL_MODE", "hybrid"),  # hybrid, vector or lexical
+    "retrieval_candidates": int(os.getenv("RETRIEVAL_CANDIDATES", "20")),
+    "rrf_k": int(os.getenv("RRF_K", "60")),
+    "query_embedding_timeout": float(os.getenv("QUERY_EMBEDDING_TIMEOUT", "5")),
+    "llm_max_concurrency": int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+    "llm_max_concurrency_per_user": int(os.getenv("LLM_MAX_CONCURRENCY_PER_USER", "1")),
+    "stream_render_interval": float(os.getenv("STREAM_RENDER_INTERVAL", "0.05")),
+    "stream_render_chars": int(os.getenv("STREAM_RENDER_CHARS", "2000")),
+    "ann_index_type": os.getenv("ANN_INDEX_TYPE", "auto"),  # auto, flat, hnsw or ivf
+    "ann_flat_max_vectors": int(os.getenv("ANN_FLAT_MAX_VECTORS", "20000")),
+    "ann_hnsw_max_vectors": int(os.getenv("ANN_HNSW_MAX_VECTORS", "1000000")),
+    "ann_quantization": os.getenv("ANN_QUANTIZATION", "none"),  # none, sq8 or pq
+    "ann_pq_m": int(os.getenv("ANN_PQ_M", "64")),
+    "ann_nlist": int(os.getenv("ANN_NLIST", "0")),  # 0 picks about 4 * sqrt(vectors)
+    "ann_nprobe": int(os.getenv("ANN_NPROBE", "16")),
+    "ann_hnsw_m": int(os.getenv("ANN_HNSW_M", "32")),
+    "ann_ef_construction": int(os.getenv("ANN_EF_CONSTRUCTION", "80")),
+    "ann_ef_search": int(os.getenv("ANN_EF_SEARCH", "64")),
+    "prompt_system_tokens": int(os.getenv("PROMPT_SYSTEM_TOKENS", "800")),
+    "prompt_history_tokens": int(os.getenv("PROMPT_HISTORY_TOKENS", "3000")),
+    "prompt_summary_tokens": int(os.getenv("PROMPT_SUMMARY_TOKENS", "400")),
+    "prompt_question_tokens": int(os.getenv("PROMPT_QUESTION_TOKENS", "1000")),
+    "prompt_context_tokens": int(os.getenv("PROMPT_CONTEXT_TOKENS", "6000")),
+    "conversation_page_size": int(os.getenv("CONVERSATION_PAGE_SIZE", "20")),
+    "message_page_size": int(os.getenv("MESSAGE_PAGE_SIZE", "50")),
+    "embedding_model": os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002"),
+    "chunk_size": int(os.getenv("CHUNK_SIZE", "512")),
+    "chunk_overlap": int(os.getenv("CHUNK_OVERLAP", "64")),
+    "embedding_cache_max_entries": int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000")),
+    "retrieval_cache_max_entries": int(os.getenv("RETRIEVAL_CACHE_MAX_ENTRIES", "1000")),
+    "index_memory_budget_mb": int(os.getenv("INDEX_MEMORY_BUDGET_MB", "2048")),
+    "catalog_check_interval": float(os.getenv("CATALOG_CHECK_INTERVAL", "5")),
+    # Coleções cujos índices são carregados na inicialização; vazio usa as mais usadas nas conversas
+    "prewarm_collections": [name.strip() for name in os.getenv("PREWARM_COLLECTIONS", "").split(",") if name.strip()],
+    "prewarm_top_collections": int(os.getenv("PREWARM_TOP_COLLECTIONS", "3")),
+    "prewarm_workers": int(os.getenv("PREWARM_WORKERS", "4")),
+    "answer_cache_max_entries": int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000")),
+    "answer_cache_ttl": float(os.getenv("ANSWER_CACHE_TTL", "86400")),
+    "answer_cache_similarity": float(os.getenv("ANSWER_CACHE_SIMILARITY", "0")),
+    "embedding_batch_tokens": int(os.getenv("EMBEDDING_BATCH_TOKENS", "50000")),
+    "embedding_batch_size": int(os.getenv("EMBEDDING_BATCH_SIZE", "256")),
+    "embedding_max_in_flight": int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "4")),
+    "embedding_max_retries": int(os.getenv("EMBEDDING_MAX_RETRIES", "6")),
     "firecrawl_api_key": os.getenv("FIRECRAWL_API_KEY", ""),
-    "firecrawl_api_url": os.getenv("FIRECRAWL_API_URL", "http://localhost:3002")
+    "firecrawl_api_url": os.getenv("FIRECRAWL_API_URL", "http://localhost:3002"),
+    "scrape_batch_size": int(os.getenv("SCRAPE_BATCH_SIZE", "50")),
+    "job_runner": os.getenv("JOB_RUNNER", "pool"),
+    "worker_processes": int(os.getenv("WORKER_PROCESSES", "2")),
+    "job_poll_interval": float(os.getenv("JOB_POLL_INTERVAL", "2")),
+    "progressive_index_interval": float(os.getenv("PROGRESSIVE_INDEX_INTERVAL", "30")),  # 0 disables
+    "http_pool_size": int(os.getenv("HTTP_POOL_SIZE", "10")),
+    "http_connect_timeout": float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")),
+    "http_read_timeout": float(os.getenv("HTTP_READ_TIMEOUT", "120")),
+    "http_max_retries": int(os.getenv("HTTP_MAX_RETRIES", "5")),
+    "http_backoff_factor": float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5")),
+    "http_backoff_jitter": float(os.getenv("HTTP_BACKOFF_JITTER", "0.5"))
 }
 
 # Caminhos
 PATHS = {
-    "conversations_db": "data/conversations/conversations.json",
-    "rag_directory": "data/rag"
+    "database": str(BASE_DIRECTORY / "data/conversations/conversations.db"),
+    # Banco TinyDB antigo, migrado para o SQLite na primeira inicialização
+    "conversations_db": str(BASE_DIRECTORY / "data/conversations/conversations.json"),
+    "rag_directory": str(BASE_DIRECTORY / "data/rag"),
+    "index_dirname": ".index",
+    "embedding_cache": str(BASE_DIRECTORY / "data/cache/embeddings.db"),
+    "answer_cache": str(BASE_DIRECTORY / "data/cache/answers.db"),
+    "jobs_directory": str(BASE_DIRECTORY / "data/jobs")
 }
 
 # Criar diretórios necessários ao importar o módulo
@@ -1,24 +1,184 @@
-from tinydb import TinyDB, Query
-from tinydb.operations import set as tinydb_set
+import json
 import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
 from core.config import PATHS
 from datetime import datetime
 import uuid
 
 logger = logging.getLogger(__name__)
 
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    collection_name TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id, id);
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+    conversation_id TEXT PRIMARY KEY,
+    summary TEXT NOT NULL,
+    last_message_id INTEGER NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_conversations_timestamp ON conversations (timestamp);
+CREATE INDEX IF NOT EXISTS idx_conversations_listing ON conversations (collection_name, timestamp, id);
+CREATE TABLE IF NOT EXISTS scraping_projects (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    source_url TEXT,
+    file_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scraping_projects_created_at ON scraping_projects (created_at);
+CREATE TABLE IF NOT EXISTS collections (
+    name TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    file_count INTEGER NOT NULL,
+    total_bytes INTEGER NOT NULL,
+    index_version TEXT,
+    dir_mtime_ns INTEGER NOT NULL,
+    modified_at TEXT,
+    updated_at TEXT NOT NULL
+);
+"""
+
+# Bancos já inicializados (schema e migração) neste processo
+_initialized = set()
+_initialized_lock = threading.Lock()
+
+
 class DatabaseManager:
-    """Gerenciador de banco de dados para operações TinyDB"""
+    """Gerenciador de banco de dados SQLite (modo WAL)"""
     
-    def __init__(self, db_path=PATHS["conversations_db"]):
+    def __init__(self, db_path=PATHS["database"], legacy_path=PATHS["conversations_db"]):
         """Inicializar banco de dados com o caminho especificado"""
         self.db_path = db_path
-        self.db = TinyDB(db_path, ensure_ascii=False)
-        logger.info(f"Banco de dados inicializado em {db_path}")
+        self._lock = threading.RLock()
+        
+        # Uma conexão por gerenciador, compartilhada entre as threads do Streamlit
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        
+        with _initialized_lock:
+            if db_path not in _initialized:
+                self.conn.executescript(SCHEMA)
+                self._set_meta("schema_version", str(SCHEMA_VERSION))
+                if legacy_path and os.path.exists(legacy_path) and self._get_meta("migrated_from") is None:
+                    self.migrate_from_json(legacy_path)
+                _initialized.add(db_path)
+                logger.info(f"Banco de dados inicializado em {db_path}")
+    
+    @contextmanager
+    def transaction(self):
+        """Executar um bloco de comandos em uma única transação"""
+        with self._lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+    
+    def execute(self, sql, params=()):
+        """Executar um comando de escrita e confirmá-lo"""
+        with self.transaction() as conn:
+            return conn.execute(sql, params).rowcount
+    
+    def query(self, sql, params=()):
+        """Executar uma consulta e retornar as linhas como dicionários"""
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params).fetchall()]
+    
+    def query_one(self, sql, params=()):
+        """Executar uma consulta e retornar a primeira linha, ou None"""
+        with self._lock:
+            row = self.conn.execute(sql, params).fetchone()
+        return dict(row) if row else None
+    
+    def _get_meta(self, key):
+        """Ler um valor da tabela de metadados"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    def _set_meta(self, key, value):
+        """Gravar um valor na tabela de metadados"""
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
     
-    def get_table(self, table_name):
-        """Obter uma tabela específica do banco de dados"""
-        return self.db.table(table_name)
+    @staticmethod
+    def _insert_history(conn, conversation_id, chat_history, timestamp):
+        """Inserir uma lista de mensagens (role, conteúdo) no log de mensagens"""
+        conn.executemany(
+            "INSERT INTO messages (conversation_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+            [(conversation_id, role, content, timestamp) for role, content in chat_history]
+        )
+    
+    def migrate_from_json(self, json_path):
+        """Importar conversas e projetos de um banco TinyDB (JSON)"""
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao ler o banco antigo {json_path}: {str(e)}")
+            return 0
+        
+        conversations = list((data.get("conversations") or {}).values())
+        projects = list((data.get("scraping_projects") or {}).values())
+        
+        with self.transaction() as conn:
+            for c in conversations:
+                if not c.get("id"):
+                    continue
+                timestamp = c.get("timestamp") or datetime.now().isoformat()
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO conversations (id, title, timestamp, collection_name) VALUES (?, ?, ?, ?)",
+                    (c["id"], c.get("title") or "Nova conversa", timestamp, c.get("collection_name"))
+                ).rowcount
+                if inserted:
+                    self._insert_history(conn, c["id"], c.get("chat_history") or [], timestamp)
+            conn.executemany(
+                "INSERT OR IGNORE INTO scraping_projects (id, name, source_url, file_count, created_at, status) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        p["id"],
+                        p["name"],
+                        p.get("source_url"),
+                        p.get("file_count") or 0,
+                        p.get("created_at") or datetime.now().isoformat(),
+                        p.get("status")
+                    )
+                    for p in projects if p.get("id") and p.get("name")
+                ]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)",
+                (os.path.abspath(json_path),)
+            )
+        
+        logger.info(f"Migradas {len(conversations)} conversas e {len(projects)} projetos de {json_path}")
+        return len(conversations) + len(projects)
+
 
 class ConversationManager:
     """Gerenciador para operações de conversas"""
@@ -28,55 +188,171 @@ class ConversationManager:
         if db_manager is None:
             db_manager = DatabaseManager()
         self.db_manager = db_manager
-        self.conversations = self.db_manager.get_table("conversations")
-        self.Query = Query()
+    
+    def _with_history(self, conversations):
+        """Anexar o histórico completo (lista de (role, conteúdo)) a cada conversa"""
+        for conversation in conversations:
+            messages, _ = self.load_messages(conversation["id"])
+            conversation["chat_history"] = [(m["role"], m["content"]) for m in messages]
+        return conversations
     
     def load_all_conversations(self):
         """Carregar todas as conversas ordenadas por timestamp (mais recentes primeiro)"""
-        conversations = self.conversations.all()
-        return sorted(conversations, key=lambda x: x.get("timestamp", ""), reverse=True)
+        rows = self.db_manager.query("SELECT * FROM conversations ORDER BY timestamp DESC")
+        return self._with_history(rows)
     
     def load_conversations_by_collection(self, collection_name):
         """Carregar conversas filtradas por coleção"""
-        conversations = self.conversations.search(self.Query.collection_name == collection_name)
-        return sorted(conversations, key=lambda x: x.get("timestamp", ""), reverse=True)
+        rows = self.db_manager.query(
+            "SELECT * FROM conversations WHERE collection_name IS ? ORDER BY timestamp DESC",
+            (collection_name,)
+        )
+        return self._with_history(rows)
+    
+    def most_used_collections(self, limit):
+        """Listar os nomes das coleções com mais conversas, da mais usada para a menos usada"""
+        rows = self.db_manager.query(
+            "SELECT collection_name FROM conversations WHERE collection_name IS NOT NULL "
+            "GROUP BY collection_name ORDER BY COUNT(*) DESC, MAX(timestamp) DESC LIMIT ?",
+            (limit,)
+        )
+        return [row["collection_name"] for row in rows]
+    
+    def list_conversations(self, collection_name, limit=20, cursor=None):
+        """Listar (id, título, timestamp) das conversas de uma coleção, uma página por vez
+        
+        A paginação usa o índice (collection_name, timestamp, id): ``cursor`` é o
+        valor retornado pela página anterior e a lista retornada é acompanhada do
+        cursor da próxima página, ou None quando não há mais conversas.
+        """
+        if cursor is None:
+            rows = self.db_manager.query(
+                "SELECT id, title, timestamp FROM conversations WHERE collection_name IS ? "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (collection_name, limit + 1)
+            )
+        else:
+            rows = self.db_manager.query(
+                "SELECT id, title, timestamp FROM conversations WHERE collection_name IS ? "
+                "AND (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (collection_name, cursor[0], cursor[1], limit + 1)
+            )
+        
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, (rows[-1]["timestamp"], rows[-1]["id"])
     
     def load_conversation(self, conversation_id):
-        """Carregar uma conversa específica por ID"""
-        return self.conversations.get(self.Query.id == conversation_id)
+        """Carregar uma conversa específica por ID, com o histórico completo"""
+        row = self.db_manager.query_one("SELECT * FROM conversations WHERE id = ?", (conversation_id,))
+        return self._with_history([row])[0] if row else None
     
-    def save_conversation(self, conversation_id, title, chat_history, collection_name=None):
-        """Salvar ou atualizar uma conversa"""
+    def load_messages(self, conversation_id, limit=None, before_id=None):
+        """Carregar mensagens de uma conversa em ordem cronológica, da mais recente para trás
+        
+        Com ``limit``, retorna só as últimas mensagens anteriores a ``before_id``,
+        junto com o cursor para a página anterior (None quando não há mais).
+        """
+        sql = "SELECT id, role, content, timestamp FROM messages WHERE conversation_id = ?"
+        params = [conversation_id]
+        if before_id is not None:
+            sql += " AND id < ?"
+            params.append(before_id)
+        sql += " ORDER BY id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit + 1)
+        
+        rows = self.db_manager.query(sql, params)
+        has_more = limit is not None and len(rows) > limit
+        rows = rows[:limit] if limit is not None else rows
+        rows.reverse()
+        return rows, (rows[0]["id"] if has_more else None)
+    
+    def create_conversation(self, conversation_id, title, collection_name=None):
+        """Criar uma conversa vazia (ou apenas atualizar seus dados, se já existir)"""
         conversation = {
             "id": conversation_id,
             "title": title,
-            "chat_history": chat_history,
             "timestamp": datetime.now().isoformat(),
             "collection_name": collection_name
         }
-        
-        # Verificar se a conversa existe
-        existing = self.conversations.get(self.Query.id == conversation_id)
-        if existing:
-            self.conversations.update(conversation, self.Query.id == conversation_id)
-            logger.debug(f"Conversa atualizada: {conversation_id}")
-        else:
-            self.conversations.insert(conversation)
-            logger.debug(f"Nova conversa inserida: {conversation_id}")
-        
+        self.db_manager.execute(
+            "INSERT INTO conversations (id, title, timestamp, collection_name) "
+            "VALUES (:id, :title, :timestamp, :collection_name) "
+            "ON CONFLICT (id) DO UPDATE SET title = excluded.title, "
+            "timestamp = excluded.timestamp, collection_name = excluded.collection_name",
+            conversation
+        )
+        logger.debug(f"Conversa criada: {conversation_id}")
         return conversation
     
+    def append_message(self, conversation_id, role, content, collection_name=None):
+        """Acrescentar uma mensagem ao log da conversa, sem reescrever o histórico"""
+        timestamp = datetime.now().isoformat()
+        with self.db_manager.transaction() as conn:
+            # A conversa é criada na primeira mensagem e tem o timestamp atualizado nas seguintes
+            conn.execute(
+                "INSERT INTO conversations (id, title, timestamp, collection_name) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET timestamp = excluded.timestamp",
+                (conversation_id, "Nova conversa", timestamp, collection_name)
+            )
+            message_id = conn.execute(
+                "INSERT INTO messages (conversation_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+                (conversation_id, role, content, timestamp)
+            ).lastrowid
+        return {"id": message_id, "role": role, "content": content, "timestamp": timestamp}
+    
+    def save_conversation(self, conversation_id, title, chat_history, collection_name=None):
+        """Salvar ou atualizar uma conversa, substituindo todo o histórico"""
+        conversation = self.create_conversation(conversation_id, title, collection_name)
+        with self.db_manager.transaction() as conn:
+            conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+            DatabaseManager._insert_history(conn, conversation_id, chat_history, conversation["timestamp"])
+        logger.debug(f"Conversa salva: {conversation_id}")
+        
+        return {**conversation, "chat_history": chat_history}
+    
+    def load_messages_after(self, conversation_id, after_id=0):
+        """Carregar, em ordem cronológica, as mensagens de uma conversa posteriores à mensagem after_id"""
+        return self.db_manager.query(
+            "SELECT id, role, content FROM messages WHERE conversation_id = ? AND id > ? ORDER BY id",
+            (conversation_id, after_id)
+        )
+    
+    def load_summary(self, conversation_id):
+        """Carregar o resumo em cache das mensagens mais antigas de uma conversa"""
+        return self.db_manager.query_one(
+            "SELECT summary, last_message_id FROM conversation_summaries WHERE conversation_id = ?",
+            (conversation_id,)
+        )
+    
+    def save_summary(self, conversation_id, summary, last_message_id):
+        """Salvar o resumo das mensagens de uma conversa até a mensagem last_message_id, inclusive"""
+        self.db_manager.execute(
+            "INSERT OR REPLACE INTO conversation_summaries "
+            "(conversation_id, summary, last_message_id, timestamp) VALUES (?, ?, ?, ?)",
+            (conversation_id, summary, last_message_id, datetime.now().isoformat())
+        )
+        logger.debug(f"Resumo salvo para conversa: {conversation_id} (até a mensagem {last_message_id})")
+    
     def update_conversation_title(self, conversation_id, title):
         """Atualizar apenas o título de uma conversa"""
-        self.conversations.update(
-            tinydb_set("title", title),
-            self.Query.id == conversation_id
-        )
+        self.db_manager.execute("UPDATE conversations SET title = ? WHERE id = ?", (title, conversation_id))
         logger.debug(f"Título atualizado para conversa: {conversation_id}")
     
+    def get_conversation_title(self, conversation_id):
+        """Obter apenas o título de uma conversa, ou None se ela não existir"""
+        row = self.db_manager.query_one("SELECT title FROM conversations WHERE id = ?", (conversation_id,))
+        return row["title"] if row else None
+    
     def delete_conversation(self, conversation_id):
         """Excluir uma conversa por ID"""
-        self.conversations.remove(self.Query.id == conversation_id)
+        with self.db_manager.transaction() as conn:
+            conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+            conn.execute("DELETE FROM conversation_summaries WHERE conversation_id = ?", (conversation_id,))
+            conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
         logger.debug(f"Conversa excluída: {conversation_id}")
         return True
     
@@ -93,8 +369,6 @@ class ScrapingProjectManager:
         if db_manager is None:
             db_manager = DatabaseManager()
         self.db_manager = db_manager
-        self.projects = self.db_manager.get_table("scraping_projects")
-        self.Query = Query()
     
     def save_project(self, project_name, source_url, file_count, status="completed"):
         """Salvar um projeto de scraping"""
@@ -107,17 +381,20 @@ class ScrapingProjectManager:
             "status": status
         }
         
-        self.projects.insert(project)
+        self.db_manager.execute(
+            "INSERT INTO scraping_projects (id, name, source_url, file_count, created_at, status) "
+            "VALUES (:id, :name, :source_url, :file_count, :created_at, :status)",
+            project
+        )
         logger.info(f"Projeto de scraping salvo: {project_name}")
         return project
     
     def get_all_projects(self):
         """Obter todos os projetos de scraping"""
-        projects = self.projects.all()
-        return sorted(projects, key=lambda x: x.get("created_at", ""), reverse=True)
+        return self.db_manager.query("SELECT * FROM scraping_projects ORDER BY created_at DESC")
     
     def delete_project(self, project_id):
         """Excluir um projeto de scraping"""
-        self.projects.remove(self.Query.id == project_id)
+        self.db_manager.execute("DELETE FROM scraping_projects WHERE id = ?", (project_id,))
         logger.info(f"Projeto de scraping excluído: {project_id}")
-        return True
\ No newline at end of file
+        return True
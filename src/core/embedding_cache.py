@@ -0,0 +1,198 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from core.config import APP_CONFIG, PATHS
+from core.embedding_scheduler import EmbeddingScheduler
+
+logger = logging.getLogger(__name__)
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_BATCH_SIZE = 500
+
+_cache_instance = None
+_cache_instance_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    """Get the embedding cache shared by the whole process"""
+    global _cache_instance
+    with _cache_instance_lock:
+        if _cache_instance is None:
+            _cache_instance = EmbeddingCache()
+        return _cache_instance
+
+
+class EmbeddingCache:
+    """Size-bounded LRU cache of embedding vectors stored in SQLite"""
+    
+    def __init__(self, db_path=PATHS["embedding_cache"], max_entries=None):
+        """Open (or create) the cache database"""
+        self.db_path = db_path
+        self.max_entries = max_entries or APP_CONFIG["embedding_cache_max_entries"]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self.conn.commit()
+        
+        self._entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        logger.info(f"Embedding cache initialized at {db_path} ({self._entries} entries)")
+    
+    @staticmethod
+    def text_hash(text):
+        """Hash a text after normalizing its whitespace"""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+    
+    def get_many(self, model, texts):
+        """Return the cached vector for each text, or None where it is missing"""
+        hashes = [self.text_hash(text) for text in texts]
+        found = {}
+        
+        with self._lock:
+            unique_hashes = list(dict.fromkeys(hashes))
+            for i in range(0, len(unique_hashes), _QUERY_BATCH_SIZE):
+                batch = unique_hashes[i:i + _QUERY_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch]
+                ).fetchall()
+                found.update(rows)
+            
+            # Refresh recency of the entries that were used
+            if found:
+                now = time.time()
+                hit_hashes = list(found)
+                for i in range(0, len(hit_hashes), _QUERY_BATCH_SIZE):
+                    batch = hit_hashes[i:i + _QUERY_BATCH_SIZE]
+                    placeholders = ",".join("?" * len(batch))
+                    self.conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash IN ({placeholders})",
+                        [now, model, *batch]
+                    )
+                self.conn.commit()
+            
+            vectors = [
+                np.frombuffer(found[h], dtype=np.float32).tolist() if h in found else None
+                for h in hashes
+            ]
+            hits = sum(1 for vector in vectors if vector is not None)
+            self.hits += hits
+            self.misses += len(vectors) - hits
+        
+        return vectors
+    
+    def put_many(self, model, texts, vectors):
+        """Store vectors for texts, evicting the least recently used entries beyond the size limit"""
+        now = time.time()
+        rows = [
+            (model, self.text_hash(text), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._entries += len(rows)
+            
+            if self._entries > self.max_entries:
+                # Other processes share the file, so recount before evicting
+                self._entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                excess = self._entries - self.max_entries
+                if excess > 0:
+                    self.conn.execute(
+                        "DELETE FROM embeddings WHERE rowid IN "
+                        "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                        (excess,)
+                    )
+                    self._entries -= excess
+                    logger.info(f"Evicted {excess} entries from the embedding cache")
+            
+            self.conn.commit()
+    
+    def stats(self):
+        """Return hit/miss counters and the current number of entries"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self._entries
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that reads the embedding cache before calling the underlying model"""
+    
+    def __init__(self, embeddings, model_name, cache=None, scheduler=None):
+        """Wrap an embeddings model whose vectors are cached under model_name"""
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache or get_embedding_cache()
+        self.scheduler = scheduler or EmbeddingScheduler(embeddings)
+    
+    def embed_documents_stream(self, texts):
+        """Yield (positions, vectors) batches: cached vectors first, then each embedded batch as it completes"""
+        vectors = self.cache.get_many(self.model_name, texts)
+        
+        cached = [i for i, vector in enumerate(vectors) if vector is not None]
+        if cached:
+            yield cached, [vectors[i] for i in cached]
+        
+        # Embed each distinct missing text once
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(EmbeddingCache.text_hash(texts[i]), []).append(i)
+        if not missing:
+            return
+        
+        groups = list(missing.values())
+        missing_texts = [texts[positions[0]] for positions in groups]
+        for batch, computed in self.scheduler.embed_stream(missing_texts):
+            self.cache.put_many(self.model_name, [missing_texts[j] for j in batch], computed)
+            
+            positions = []
+            batch_vectors = []
+            for j, vector in zip(batch, computed):
+                positions.extend(groups[j])
+                batch_vectors.extend([vector] * len(groups[j]))
+            yield positions, batch_vectors
+        
+        logger.debug(f"Embedded {len(missing_texts)} texts, {len(cached)} served from cache")
+    
+    def embed_documents(self, texts):
+        """Embed texts, calling the model only for texts that are not cached"""
+        vectors = [None] * len(texts)
+        for positions, batch_vectors in self.embed_documents_stream(texts):
+            for i, vector in zip(positions, batch_vectors):
+                vectors[i] = vector
+        return vectors
+    
+    def embed_query(self, text):
+        """Embed a query text through the cache"""
+        vector = self.cache.get_many(self.model_name, [text])[0]
+        if vector is None:
+            vector = self.scheduler.embed_query(text)
+            self.cache.put_many(self.model_name, [text], [vector])
+        return vector
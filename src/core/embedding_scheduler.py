@@ -0,0 +1,115 @@
+import logging
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from core.chunking import get_encoding
+from core.config import APP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _status_code(error):
+    """Extract an HTTP status code from an API client exception, if any"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error):
+    """Read the server's Retry-After hint in seconds, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingScheduler:
+    """Embed texts in token-budgeted batches with a bounded number of requests in flight"""
+    
+    def __init__(self, embeddings, max_batch_tokens=None, max_batch_size=None, max_in_flight=None, max_retries=None):
+        """Initialize the scheduler around an embeddings model"""
+        self.embeddings = embeddings
+        self.max_batch_tokens = max_batch_tokens or APP_CONFIG["embedding_batch_tokens"]
+        self.max_batch_size = max_batch_size or APP_CONFIG["embedding_batch_size"]
+        self.max_in_flight = max_in_flight or APP_CONFIG["embedding_max_in_flight"]
+        self.max_retries = APP_CONFIG["embedding_max_retries"] if max_retries is None else max_retries
+        self._encoding = None
+    
+    def count_tokens(self, text):
+        """Count the tokens of a text with the embedding model's encoding"""
+        if self._encoding is None:
+            self._encoding = get_encoding()
+        return len(self._encoding.encode(text, disallowed_special=()))
+    
+    def batches(self, texts):
+        """Pack text positions into batches bounded by token budget and batch size"""
+        batch = []
+        batch_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= self.max_batch_size):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(i)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+    
+    def embed_stream(self, texts):
+        """Yield (positions, vectors) for each batch as soon as its request completes"""
+        batches = self.batches(texts)
+        executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="embedding")
+        pending = {}
+        
+        try:
+            while True:
+                # Keep at most max_in_flight requests running
+                for batch in batches:
+                    future = executor.submit(self._embed_with_retry, [texts[i] for i in batch])
+                    pending[future] = batch
+                    if len(pending) >= self.max_in_flight:
+                        break
+                
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            # Stop scheduling on error or when the consumer stops early
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def embed_query(self, text):
+        """Embed a single query text with the same retry policy as the batches"""
+        return self._with_retry(self.embeddings.embed_query, text)
+    
+    def _embed_with_retry(self, texts):
+        """Embed one batch, backing off and retrying on rate limits and transient errors"""
+        return self._with_retry(self.embeddings.embed_documents, texts)
+    
+    def _with_retry(self, embed, payload):
+        """Call embed(payload), backing off and retrying on rate limits and transient errors
+        
+        This is the only retry layer: the API client itself is created with
+        max_retries=0, so a failing request is never retried twice over.
+        """
+        attempt = 0
+        while True:
+            try:
+                return embed(payload)
+            except Exception as e:
+                status = _status_code(e)
+                retryable = status in RETRYABLE_STATUS_CODES or type(e).__name__ in ("APIConnectionError", "APITimeoutError")
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                
+                # Exponential backoff with full jitter, unless the server says how long to wait
+                delay = _retry_after(e) or random.uniform(0, min(60.0, 2.0 ** attempt))
+                attempt += 1
+                logger.warning(f"Embedding request failed ({status or type(e).__name__}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from core.config import APP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# While a request waits for a slot or its first token, the consumer wakes up this often
+KEEPALIVE_INTERVAL = 0.5
+
+_DONE = object()
+
+
+class GenerationScheduler:
+    """Run LLM streams on one background event loop with global and per-user concurrency limits
+    
+    At most max_concurrency generations are in flight across all sessions and at
+    most max_per_user for one user. Waiting requests are queued per user and slots
+    go to the user served least recently, so one user sending many questions
+    cannot starve the others. Closing the stream returned by ``stream`` (e.g.
+    because Streamlit stopped the script when the user navigated away) cancels the
+    generation, queued or running, which closes the HTTP request to the model.
+    """
+    
+    def __init__(self, max_concurrency=None, max_per_user=None):
+        """Initialize the scheduler and start its event loop thread"""
+        self.max_concurrency = max_concurrency or APP_CONFIG["llm_max_concurrency"]
+        self.max_per_user = max_per_user or APP_CONFIG["llm_max_concurrency_per_user"]
+        # Waiting requests per user, and when each active user was last given a slot
+        self._waiting = {}
+        self._running = {}
+        self._last_served = {}
+        self._turn = 0
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self.loop.run_forever, name="generation-loop", daemon=True)
+        thread.start()
+        logger.info(
+            f"Generation scheduler started: {self.max_concurrency} concurrent, {self.max_per_user} per user"
+        )
+    
+    def stream(self, user_id, stream_factory, keepalive=None):
+        """Yield the items of the async iterator returned by stream_factory(), run under the limits
+        
+        When ``keepalive`` is given it is yielded every KEEPALIVE_INTERVAL seconds
+        without an item, so the consumer gets a chance to stop while waiting.
+        """
+        items = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(self._run(user_id, stream_factory, items), self.loop)
+        try:
+            while True:
+                try:
+                    item = items.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    if keepalive is not None:
+                        yield keepalive
+                    continue
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            # No-op when the generation already finished
+            future.cancel()
+    
+    async def _run(self, user_id, stream_factory, items):
+        """Wait for a slot, then forward the stream's items to the consumer's queue"""
+        await self._acquire(user_id)
+        try:
+            async for item in stream_factory():
+                items.put(item)
+            items.put(_DONE)
+            self.completed += 1
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            logger.info(f"Cancelled generation for {user_id}")
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Error in generation for {user_id}: {str(e)}")
+            items.put(e)
+        finally:
+            self._release(user_id)
+    
+    async def _acquire(self, user_id):
+        """Queue the request behind the user's earlier ones and wait for a slot"""
+        waiter = self.loop.create_future()
+        self._waiting.setdefault(user_id, deque()).append(waiter)
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        queued_at = time.monotonic()
+        self._dispatch()
+        
+        if not waiter.done():
+            logger.info(f"Generation for {user_id} queued ({self.queued} waiting, {self.in_flight} in flight)")
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just before the cancellation arrived
+                self._release(user_id)
+            else:
+                self._remove_waiter(user_id, waiter)
+            self.cancelled += 1
+            raise
+        self.started += 1
+        self.total_wait += time.monotonic() - queued_at
+    
+    def _dispatch(self):
+        """Grant free slots to waiting requests, the least recently served user first"""
+        while self.in_flight < self.max_concurrency:
+            eligible = [user for user in self._waiting if self._running.get(user, 0) < self.max_per_user]
+            if not eligible:
+                return
+            user_id = min(eligible, key=lambda user: self._last_served.get(user, -1))
+            waiters = self._waiting[user_id]
+            waiter = waiters.popleft()
+            if not waiters:
+                del self._waiting[user_id]
+            self.queued -= 1
+            self.in_flight += 1
+            self._running[user_id] = self._running.get(user_id, 0) + 1
+            self._last_served[user_id] = self._turn
+            self._turn += 1
+            waiter.set_result(None)
+    
+    def _remove_waiter(self, user_id, waiter):
+        """Drop a request that was cancelled while queued"""
+        waiters = self._waiting.get(user_id)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del self._waiting[user_id]
+        self.queued -= 1
+    
+    def _release(self, user_id):
+        """Free a slot and hand it to the next waiting request"""
+        self.in_flight -= 1
+        self._running[user_id] -= 1
+        if not self._running[user_id]:
+            del self._running[user_id]
+            if user_id not in self._waiting:
+                # An idle user competes again as a newcomer
+                self._last_served.pop(user_id, None)
+        self._dispatch()
+    
+    def stats(self):
+        """Return queue depth, in-flight count and counters of finished generations"""
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "cancelled": self.cancelled,
+            "failed": self.failed,
+            "average_wait": self.total_wait / self.started if self.started else 0.0
+        }
@@ -0,0 +1,69 @@
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from core.config import APP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_http_session(pool_size=None, max_retries=None, backoff_factor=None, backoff_jitter=None):
+    """
+    Create a requests session with a keep-alive connection pool and a retry policy
+    
+    Args:
+        pool_size: Maximum number of connections kept open per host
+        max_retries: Retries for connection errors and retryable status codes
+        backoff_factor: Base of the exponential backoff between retries, in seconds
+        backoff_jitter: Maximum random delay added to each backoff, in seconds
+    
+    Returns:
+        Configured requests.Session
+    """
+    pool_size = pool_size or APP_CONFIG["http_pool_size"]
+    retry = Retry(
+        total=APP_CONFIG["http_max_retries"] if max_retries is None else max_retries,
+        backoff_factor=APP_CONFIG["http_backoff_factor"] if backoff_factor is None else backoff_factor,
+        backoff_jitter=APP_CONFIG["http_backoff_jitter"] if backoff_jitter is None else backoff_jitter,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "HEAD", "OPTIONS"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_http_session():
+    """
+    Get the pooled HTTP session shared by the whole process
+    
+    Returns:
+        Shared requests.Session
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_http_session()
+            logger.info("Shared HTTP session created")
+        return _session
+
+
+def get_http_timeout():
+    """
+    Get the (connect, read) timeout tuple for outgoing requests
+    
+    Returns:
+        Tuple of connect and read timeouts in seconds
+    """
+    return (APP_CONFIG["http_connect_timeout"], APP_CONFIG["http_read_timeout"])
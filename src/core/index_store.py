@@ -0,0 +1,219 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+import faiss
+from langchain_community.vectorstores import FAISS
+from core.ann_index import FLAT_SETTINGS, configure_search
+from core.config import PATHS
+from core.lexical_index import MAX_TERM_LENGTH, BM25Index
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+INDEX_FILENAME = "index.faiss"
+DOCSTORE_FILENAME = "docstore.pkl"
+LEXICAL_FILENAME = "lexical.npz"
+LOCK_FILENAME = "index.lock"
+MANIFEST_FORMAT = 2
+
+
+class IndexStore:
+    """Persistent FAISS index (index + docstore + manifest) for a single collection"""
+    
+    def __init__(self, collection_path):
+        """Initialize the store for the given collection directory"""
+        self.collection_path = collection_path
+        self.index_dir = os.path.join(collection_path, PATHS["index_dirname"])
+        self.manifest_path = os.path.join(self.index_dir, MANIFEST_FILENAME)
+        self.index_path = os.path.join(self.index_dir, INDEX_FILENAME)
+        self.docstore_path = os.path.join(self.index_dir, DOCSTORE_FILENAME)
+        self.lexical_path = os.path.join(self.index_dir, LEXICAL_FILENAME)
+        self.lock_path = os.path.join(self.index_dir, LOCK_FILENAME)
+    
+    @contextmanager
+    def lock(self):
+        """Hold the collection's index lock, shared by every thread and process that reads or writes the index
+        
+        Index updates and loads run under this lock, so a reader never pairs files
+        from two different builds and two builders never interleave their writes.
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+    
+    def _temp_path(self, path):
+        """Create a uniquely named temporary file next to path, to be moved over it once written"""
+        fd, temp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=self.index_dir)
+        os.close(fd)
+        return temp_path
+    
+    def scan_files(self):
+        """Return a {relative_path: {"size", "mtime_ns"}} fingerprint of the collection's markdown files"""
+        files = {}
+        for dirpath, dirnames, filenames in os.walk(self.collection_path):
+            # Never descend into the index directory itself
+            dirnames[:] = [d for d in dirnames if d != PATHS["index_dirname"]]
+            for filename in filenames:
+                if not filename.endswith(".md"):
+                    continue
+                file_path = os.path.join(dirpath, filename)
+                stat = os.stat(file_path)
+                relative_path = os.path.relpath(file_path, self.collection_path)
+                files[relative_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        return files
+    
+    @staticmethod
+    def hash_file(file_path):
+        """Compute the SHA-256 content hash of a file"""
+        with open(file_path, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    
+    @staticmethod
+    def chunk_ids(relative_path, chunks):
+        """Derive stable docstore ids from each chunk's source file and content"""
+        ids = []
+        occurrences = {}
+        for chunk in chunks:
+            digest = hashlib.sha256(f"{relative_path}\0{chunk.page_content}".encode("utf-8")).hexdigest()
+            # Identical chunks within one file still need distinct ids
+            count = occurrences.get(digest, 0)
+            occurrences[digest] = count + 1
+            ids.append(digest if count == 0 else f"{digest}-{count}")
+        return ids
+    
+    def load_manifest(self):
+        """Load the manifest, or None if the index was never built"""
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Invalid index manifest {self.manifest_path}: {str(e)}")
+            return None
+        
+        if manifest.get("format") != MANIFEST_FORMAT:
+            logger.info(f"Ignoring index manifest in an older format: {self.manifest_path}")
+            return None
+        return manifest
+    
+    def has_index(self):
+        """Check whether index and docstore files exist on disk"""
+        return os.path.exists(self.index_path) and os.path.exists(self.docstore_path)
+    
+    def disk_size(self):
+        """Total size in bytes of the persisted index files, an estimate of the loaded index's memory"""
+        paths = (self.index_path, self.docstore_path, self.lexical_path)
+        return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+    
+    def is_current(self, manifest, files):
+        """Check whether a manifest still matches the size and mtime of the given files"""
+        if manifest is None or not self.has_index():
+            return False
+        
+        indexed = manifest["files"]
+        if indexed.keys() != files.keys():
+            return False
+        return all(
+            indexed[path]["size"] == stat["size"] and indexed[path]["mtime_ns"] == stat["mtime_ns"]
+            for path, stat in files.items()
+        )
+    
+    def save(self, vector_store, files, settings, ann=None):
+        """Persist a vector store and write its manifest, returning the manifest
+        
+        ``files`` maps each relative path to its size, mtime, content hash and chunk ids;
+        ``settings`` records the embedding and chunking options the index was built with
+        and ``ann`` the index type and quantization (see core.ann_index). Call it
+        while holding ``lock``.
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        
+        # Write to temporary files first so a crash never leaves a partial index
+        index_tmp = self._temp_path(self.index_path)
+        docstore_tmp = self._temp_path(self.docstore_path)
+        lexical_tmp = self._temp_path(self.lexical_path)
+        try:
+            faiss.write_index(vector_store.index, index_tmp)
+            with open(docstore_tmp, "wb") as f:
+                pickle.dump((vector_store.docstore, vector_store.index_to_docstore_id), f)
+            self.build_lexical(vector_store).save(lexical_tmp)
+            
+            os.replace(index_tmp, self.index_path)
+            os.replace(docstore_tmp, self.docstore_path)
+            os.replace(lexical_tmp, self.lexical_path)
+        finally:
+            for path in (index_tmp, docstore_tmp, lexical_tmp):
+                if os.path.exists(path):
+                    os.remove(path)
+        
+        # The manifest is written last: a crash before this point leaves the index stale
+        manifest = {
+            "format": MANIFEST_FORMAT,
+            "version": uuid.uuid4().hex,
+            "built_at": datetime.now().isoformat(),
+            "settings": settings,
+            "ann": ann or FLAT_SETTINGS,
+            "vector_count": vector_store.index.ntotal,
+            "files": files
+        }
+        manifest_tmp = self._temp_path(self.manifest_path)
+        with open(manifest_tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(manifest_tmp, self.manifest_path)
+        
+        logger.info(f"Saved index for {self.collection_path} ({manifest['vector_count']} vectors)")
+        return manifest
+    
+    def load(self, embeddings, mmap=True):
+        """Load the persisted vector store, memory-mapping the FAISS index when possible; call it while holding ``lock``"""
+        if mmap:
+            try:
+                index = faiss.read_index(self.index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError as e:
+                logger.warning(f"Memory-mapped load failed for {self.index_path}, reading into memory: {str(e)}")
+                index = faiss.read_index(self.index_path)
+        else:
+            index = faiss.read_index(self.index_path)
+        
+        # The docstore is written by this application only (see save)
+        with open(self.docstore_path, "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        
+        logger.info(f"Loaded index for {self.collection_path} ({index.ntotal} vectors)")
+        return FAISS(embeddings, configure_search(index), docstore, index_to_docstore_id)
+    
+    @staticmethod
+    def build_lexical(vector_store):
+        """Build the BM25 index over every chunk in a vector store's docstore"""
+        doc_ids = list(vector_store.index_to_docstore_id.values())
+        texts = [vector_store.docstore.search(doc_id).page_content for doc_id in doc_ids]
+        return BM25Index.build(doc_ids, texts)
+    
+    def load_lexical(self, vector_store):
+        """Load the BM25 index, building it from the vector store if it was never written"""
+        try:
+            lexical = BM25Index.load(self.lexical_path)
+            # Indexes written before terms were capped can hold huge fixed-width vocabularies
+            if lexical.terms.dtype.itemsize <= 4 * MAX_TERM_LENGTH:
+                return lexical
+            logger.info(f"Rebuilding lexical index with oversized terms for {self.collection_path}")
+        except FileNotFoundError:
+            logger.info(f"Building missing lexical index for {self.collection_path}")
+        
+        lexical = self.build_lexical(vector_store)
+        lexical_tmp = self._temp_path(self.lexical_path)
+        lexical.save(lexical_tmp)
+        os.replace(lexical_tmp, self.lexical_path)
+        return lexical
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from core.config import PATHS
+from models.documents import ScrapingJob
+
+logger = logging.getLogger(__name__)
+
+JOB_FILENAME = "job.json"
+LINKS_FILENAME = "links.json"
+COMPLETED_FILENAME = "completed.log"
+LOCK_FILENAME = "worker.lock"
+FINISHED_STATUSES = ("completed",)
+
+
+def _process_alive(pid):
+    """Verificar se um processo ainda está em execução"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _write_json_atomic(path, data):
+    """Write JSON to a uniquely named temporary file and move it into place"""
+    fd, tmp_path = tempfile.mkstemp(prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ScrapingJobManager:
+    """Gerenciador de jobs de scraping com checkpoints em disco
+    
+    Cada job fica em ``data/jobs/<id>/``: o estado do job (``job.json``), a lista de
+    links mapeados (``links.json``) e um log append-only das URLs já concluídas
+    (``completed.log``), o que permite retomar o job depois de uma falha.
+    """
+    
+    def __init__(self, jobs_directory=PATHS["jobs_directory"]):
+        """Inicializar com o diretório onde os jobs são armazenados"""
+        self.jobs_directory = jobs_directory
+        os.makedirs(jobs_directory, exist_ok=True)
+    
+    def _job_path(self, job_id, filename):
+        """Caminho de um arquivo do job"""
+        return os.path.join(self.jobs_directory, job_id, filename)
+    
+    def create_job(self, url, project_name):
+        """Criar e persistir um novo job"""
+        job = ScrapingJob(url=url, project_name=project_name, id=str(uuid.uuid4()))
+        os.makedirs(os.path.join(self.jobs_directory, job.id), exist_ok=True)
+        self.save_job(job)
+        logger.info(f"Job de scraping criado: {job.id} ({url} -> {project_name})")
+        return job
+    
+    def save_job(self, job):
+        """Persistir o estado de um job"""
+        _write_json_atomic(self._job_path(job.id, JOB_FILENAME), job.to_dict())
+    
+    def load_job(self, job_id):
+        """Carregar um job por ID"""
+        try:
+            with open(self._job_path(job_id, JOB_FILENAME), "r", encoding="utf-8") as f:
+                return ScrapingJob.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+    
+    def list_jobs(self, statuses=None):
+        """Listar jobs (mais recentes primeiro), opcionalmente filtrados por status"""
+        jobs = []
+        for job_id in os.listdir(self.jobs_directory):
+            job = self.load_job(job_id)
+            if job and (statuses is None or job.status in statuses):
+                jobs.append(job)
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+    
+    def find_resumable(self, url, project_name):
+        """Encontrar o job não concluído mais recente para a mesma URL e coleção"""
+        for job in self.list_jobs():
+            if job.url == url and job.project_name == project_name and job.status not in FINISHED_STATUSES:
+                return job
+        return None
+    
+    def save_links(self, job_id, links):
+        """Registrar o checkpoint da lista de links mapeados"""
+        _write_json_atomic(self._job_path(job_id, LINKS_FILENAME), links)
+    
+    def load_links(self, job_id):
+        """Carregar a lista de links mapeados, ou None se o mapeamento não terminou"""
+        try:
+            with open(self._job_path(job_id, LINKS_FILENAME), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+    
+    def mark_completed(self, job_id, url, filename=""):
+        """Registrar uma URL concluída e o arquivo gerado para ela"""
+        with open(self._job_path(job_id, COMPLETED_FILENAME), "a", encoding="utf-8") as f:
+            f.write(f"{url}\t{filename}\n")
+    
+    def load_completed(self, job_id):
+        """Carregar as URLs concluídas como {url: arquivo}"""
+        completed = {}
+        try:
+            with open(self._job_path(job_id, COMPLETED_FILENAME), "r", encoding="utf-8") as f:
+                for line in f:
+                    # A linha final pode estar incompleta se o processo caiu durante a escrita
+                    if not line.endswith("\n"):
+                        break
+                    url, _, filename = line.rstrip("\n").partition("\t")
+                    completed[url] = filename
+        except FileNotFoundError:
+            pass
+        return completed
+    
+    def claim_job(self, job_id):
+        """Reservar um job para o processo atual; retorna False se outro processo já o executa"""
+        lock_path = self._job_path(job_id, LOCK_FILENAME)
+        for _ in range(2):
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                # Locks deixados por workers que caíram são liberados
+                if self.is_running(job_id):
+                    return False
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            return True
+        return False
+    
+    def release_job(self, job_id):
+        """Liberar a reserva de um job"""
+        try:
+            os.remove(self._job_path(job_id, LOCK_FILENAME))
+        except FileNotFoundError:
+            pass
+    
+    def is_running(self, job_id):
+        """Verificar se algum processo vivo está executando o job"""
+        try:
+            with open(self._job_path(job_id, LOCK_FILENAME), "r") as f:
+                pid = int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return False
+        return pid > 0 and _process_alive(pid)
+    
+    def delete_job(self, job_id):
+        """Excluir um job e seus checkpoints"""
+        shutil.rmtree(os.path.join(self.jobs_directory, job_id), ignore_errors=True)
+        logger.info(f"Job de scraping excluído: {job_id}")
+        return True
@@ -0,0 +1,169 @@
+import logging
+import math
+import re
+from collections import Counter
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WORD_PATTERN = re.compile(r'\w+')
+CAMEL_CASE_PATTERN = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+')
+CAMEL_BOUNDARY_PATTERN = re.compile(r'[a-z][A-Z]')
+
+# Rank constant of reciprocal rank fusion (Cormack et al.)
+RRF_K = 60
+# Longer words are hashes, base64 blobs or minified code; the vocabulary array is as
+# wide as its longest term, so they are not indexed
+MAX_TERM_LENGTH = 64
+
+
+def tokenize(text):
+    """Split a text into lowercase terms, adding the parts of snake_case and camelCase identifiers
+    
+    ``get_vector_store`` is indexed as itself and as ``get``, ``vector`` and ``store``,
+    so queries match both the exact identifier and its words. Words longer than
+    MAX_TERM_LENGTH characters are dropped.
+    """
+    terms = []
+    for word in WORD_PATTERN.findall(text):
+        if len(word) > MAX_TERM_LENGTH:
+            continue
+        terms.append(word.lower())
+        if "_" in word.strip("_") or CAMEL_BOUNDARY_PATTERN.search(word):
+            parts = [part.lower() for piece in word.split("_") for part in CAMEL_CASE_PATTERN.findall(piece)]
+            if len(parts) > 1:
+                terms.extend(parts)
+    return terms
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked lists of ids into a single (id, score) ranking by summing 1 / (k + rank)"""
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+class BM25Index:
+    """Okapi BM25 inverted index with array-backed (CSR) postings
+    
+    Postings of term ``t`` are ``doc_indices[offsets[t]:offsets[t + 1]]`` with the
+    matching term frequencies in ``term_frequencies``; documents are referred to by
+    position and mapped back to their docstore ids through ``doc_ids``.
+    """
+    
+    def __init__(self, terms, offsets, doc_indices, term_frequencies, doc_lengths, doc_ids, k1=1.5, b=0.75):
+        """Initialize the index from its arrays"""
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_indices = doc_indices
+        self.term_frequencies = term_frequencies
+        self.doc_lengths = doc_lengths
+        self.doc_ids = doc_ids
+        self.k1 = k1
+        self.b = b
+        
+        self.vocabulary = {term: i for i, term in enumerate(terms.tolist())}
+        average_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        # Per-document length normalization, computed once
+        self._length_norms = (
+            k1 * (1 - b + b * doc_lengths / average_length) if average_length else np.full(len(doc_lengths), k1)
+        ).astype(np.float32)
+    
+    def __len__(self):
+        """Number of indexed documents"""
+        return len(self.doc_ids)
+    
+    @classmethod
+    def build(cls, doc_ids, texts, k1=1.5, b=0.75):
+        """Build an index over texts identified by doc_ids"""
+        vocabulary = {}
+        posting_terms = []
+        posting_docs = []
+        posting_tfs = []
+        doc_lengths = np.zeros(len(texts), dtype=np.int32)
+        
+        for doc_index, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_lengths[doc_index] = sum(counts.values())
+            for term, tf in counts.items():
+                posting_terms.append(vocabulary.setdefault(term, len(vocabulary)))
+                posting_docs.append(doc_index)
+                posting_tfs.append(tf)
+        
+        # Group postings by term: a stable sort keeps each term's documents in order
+        posting_terms = np.asarray(posting_terms, dtype=np.int32)
+        order = np.argsort(posting_terms, kind="stable")
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(posting_terms, minlength=len(vocabulary)), out=offsets[1:])
+        
+        terms = np.array(sorted(vocabulary, key=vocabulary.get), dtype=str)
+        return cls(
+            terms,
+            offsets,
+            np.asarray(posting_docs, dtype=np.int32)[order],
+            np.asarray(posting_tfs, dtype=np.float32)[order],
+            doc_lengths,
+            np.array(doc_ids, dtype=str),
+            k1,
+            b
+        )
+    
+    def search(self, query, limit):
+        """Return the ids of the best matching documents, best first"""
+        return [doc_id for doc_id, _ in self.scored_search(query, limit)]
+    
+    def scored_search(self, query, limit):
+        """Return (id, BM25 score) pairs of the best matching documents, best first"""
+        if not len(self.doc_ids):
+            return []
+        
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        document_count = len(self.doc_ids)
+        for term in set(tokenize(query)):
+            term_index = self.vocabulary.get(term)
+            if term_index is None:
+                continue
+            start, end = self.offsets[term_index], self.offsets[term_index + 1]
+            docs = self.doc_indices[start:end]
+            tfs = self.term_frequencies[start:end]
+            idf = math.log(1 + (document_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            # A term has at most one posting per document, so fancy-index assignment is safe
+            scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + self._length_norms[docs])
+        
+        matches = np.flatnonzero(scores)
+        if len(matches) > limit:
+            matches = matches[np.argpartition(-scores[matches], limit - 1)[:limit]]
+        matches = matches[np.argsort(-scores[matches], kind="stable")]
+        return list(zip(self.doc_ids[matches].tolist(), scores[matches].tolist()))
+    
+    def save(self, path):
+        """Write the index arrays to an .npz file"""
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                terms=self.terms,
+                offsets=self.offsets,
+                doc_indices=self.doc_indices,
+                term_frequencies=self.term_frequencies,
+                doc_lengths=self.doc_lengths,
+                doc_ids=self.doc_ids,
+                params=np.array([self.k1, self.b], dtype=np.float64)
+            )
+    
+    @classmethod
+    def load(cls, path):
+        """Read an index written by save"""
+        with np.load(path) as data:
+            k1, b = data["params"].tolist()
+            return cls(
+                data["terms"],
+                data["offsets"],
+                data["doc_indices"],
+                data["term_frequencies"],
+                data["doc_lengths"],
+                data["doc_ids"],
+                k1,
+                b
+            )
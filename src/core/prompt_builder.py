@@ -0,0 +1,139 @@
+import logging
+from core.chunking import get_encoding
+from core.config import APP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = """You are an experienced teacher and mentor specializing in the loaded documentation. You are deeply familiar with all the content of the documents and can explain them with clarity and depth.
+
+Your role is to:
+1. Provide complete and accurate explanations based on the documentation
+2. Help the user understand complex concepts with practical examples
+3. Offer step-by-step guidance when requested
+4. Share well-formatted and commented code examples when relevant
+5. Respond in a clear, concise, and friendly manner
+6. Never say "I don't know" or "I can't help" - always seek the best possible answer
+
+When sharing code:
+- Use markdown code blocks (```) with the language specified
+- Comment the code appropriately
+- Explain the logic and purpose of the code
+"""
+
+# Smallest remainder of the context budget worth filling with a truncated document
+MIN_TRUNCATED_DOCUMENT_TOKENS = 128
+
+
+class PromptBuilder:
+    """Assemble chat prompts within fixed token budgets for system text, history, question and context"""
+    
+    def __init__(self, model_name=None, system_tokens=None, history_tokens=None, summary_tokens=None,
+                 question_tokens=None, context_tokens=None):
+        """Initialize the builder with budgets in tokens of the chat model"""
+        self.encoding = get_encoding(model_name or APP_CONFIG["default_model"])
+        self.system_tokens = system_tokens or APP_CONFIG["prompt_system_tokens"]
+        self.history_tokens = history_tokens or APP_CONFIG["prompt_history_tokens"]
+        self.summary_tokens = summary_tokens or APP_CONFIG["prompt_summary_tokens"]
+        self.question_tokens = question_tokens or APP_CONFIG["prompt_question_tokens"]
+        self.context_tokens = context_tokens or APP_CONFIG["prompt_context_tokens"]
+        if self.summary_tokens >= self.history_tokens:
+            raise ValueError("prompt_summary_tokens must be smaller than prompt_history_tokens")
+        
+        self.system_prompt = self.truncate(SYSTEM_PROMPT, self.system_tokens)
+    
+    def count_tokens(self, text):
+        """Count the tokens of a text"""
+        return len(self.encoding.encode(text, disallowed_special=()))
+    
+    def truncate(self, text, max_tokens):
+        """Cut a text to at most max_tokens tokens"""
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return self.encoding.decode(tokens[:max_tokens])
+    
+    @staticmethod
+    def format_message(role, content):
+        """Format one history message as a prompt line"""
+        speaker = "User" if role == "user" else "Assistant"
+        return f"{speaker}: {content}\n"
+    
+    def split_history(self, chat_history, summarized=0):
+        """Return how many of the oldest messages must be summarized for the rest to fit the history budget
+        
+        ``summarized`` messages are already covered by a summary. When the remaining
+        messages no longer fit, the split moves forward so that the kept messages use
+        at most half of the budget, leaving room for the next turns before another
+        summary is needed.
+        """
+        message_budget = self.history_tokens - self.summary_tokens
+        tokens = [self.count_tokens(self.format_message(role, content)) for role, content in chat_history]
+        if sum(tokens[summarized:]) <= message_budget:
+            return summarized
+        
+        split = len(chat_history)
+        total = 0
+        for i in range(len(chat_history) - 1, summarized - 1, -1):
+            total += tokens[i]
+            if total > message_budget // 2:
+                break
+            split = i
+        
+        # Keep whole turns: the kept history starts with a user message
+        while split < len(chat_history) and chat_history[split][0] != "user":
+            split += 1
+        return split
+    
+    def build(self, question, chat_history, documents, summary=None):
+        """Build the prompt for a question, keeping each section within its budget
+        
+        The newest history messages that fit are kept (after the summary of older
+        ones, if any), and documents are added in relevance order; a document that
+        does not fit is cut to the remaining context budget, or skipped when too
+        little of it is left.
+        """
+        parts = [self.system_prompt]
+        
+        # History: summary of older turns, then the newest messages that fit
+        history_budget = self.history_tokens
+        if summary:
+            summary = self.truncate(summary, self.summary_tokens)
+            parts.append(f"\nSummary of the earlier conversation:\n{summary}\n")
+            history_budget -= self.count_tokens(summary)
+        
+        kept = []
+        for role, content in reversed(chat_history):
+            line = self.format_message(role, content)
+            tokens = self.count_tokens(line)
+            if tokens > history_budget:
+                break
+            kept.append(line)
+            history_budget -= tokens
+        if len(kept) < len(chat_history):
+            logger.debug(f"Dropped {len(chat_history) - len(kept)} history messages over the token budget")
+        
+        parts.append("\nConversation history:\n")
+        parts.extend(reversed(kept))
+        
+        # Current question
+        parts.append(f"\nUser: {self.truncate(question, self.question_tokens)}\n")
+        
+        # Context: documents in relevance order until the budget is spent
+        parts.append("\nHere is relevant information from the documents that may help answer the question:\n")
+        context_budget = self.context_tokens
+        for i, doc in enumerate(documents):
+            block = f"Document {i+1}:\n{doc.page_content}\n\n"
+            tokens = self.count_tokens(block)
+            if tokens <= context_budget:
+                parts.append(block)
+                context_budget -= tokens
+                continue
+            
+            # Cut the document to the remaining budget, or skip it for smaller, less relevant ones
+            if context_budget >= MIN_TRUNCATED_DOCUMENT_TOKENS:
+                parts.append(self.truncate(block, context_budget) + "\n\n")
+                logger.debug(f"Context budget reached after {i + 1} of {len(documents)} documents")
+                break
+        
+        parts.append("\nAssistant: ")
+        return "".join(parts)
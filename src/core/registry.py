@@ -0,0 +1,149 @@
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from core.config import APP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_registry_instance = None
+_registry_instance_lock = threading.Lock()
+
+
+def get_registry():
+    """Get the registry shared by the whole process (every Streamlit session)"""
+    global _registry_instance
+    with _registry_instance_lock:
+        if _registry_instance is None:
+            _registry_instance = Registry()
+        return _registry_instance
+
+
+class IndexEntry:
+    """A loaded collection index with its file fingerprint, size and reference count"""
+    
+    def __init__(self, key, fingerprint, value, size):
+        """Initialize an entry that nobody holds yet"""
+        self.key = key
+        self.fingerprint = fingerprint
+        self.value = value
+        self.size = size
+        self.refs = 0
+
+
+class Registry:
+    """Process-wide registry of long-lived services and loaded collection indexes
+    
+    Services (database managers, OpenAI and Firecrawl clients) are created once and
+    shared. Indexes are reference counted while in use and evicted least recently
+    used first once their total size exceeds the memory budget; an index whose
+    files changed (different fingerprint) is reloaded on its next use.
+    """
+    
+    def __init__(self, memory_budget=None):
+        """Initialize an empty registry with a memory budget for indexes, in bytes"""
+        self.memory_budget = memory_budget or APP_CONFIG["index_memory_budget_mb"] * 2 ** 20
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._services = {}
+        # Reentrant: a service factory may itself get other services
+        self._services_lock = threading.RLock()
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+    
+    def service(self, name, factory):
+        """Return the shared service registered under name, creating it with factory on first use"""
+        with self._services_lock:
+            if name not in self._services:
+                self._services[name] = factory()
+                logger.info(f"Registered service {name}")
+            return self._services[name]
+    
+    def acquire(self, key, fingerprint, loader):
+        """Return the entry of an index, loading it when missing or its fingerprint changed
+        
+        ``loader`` returns ``(value, size_in_bytes)``. Only one thread loads a given
+        key; the others wait and reuse the result. The caller must release the entry.
+        """
+        with self._lock:
+            entry = self._hold(key, fingerprint)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        
+        with load_lock:
+            with self._lock:
+                entry = self._hold(key, fingerprint)
+                if entry is not None:
+                    return entry
+                self.misses += 1
+            
+            value, size = loader()
+            entry = IndexEntry(key, fingerprint, value, size)
+            
+            with self._lock:
+                # A replaced entry stays alive for the threads still holding it
+                self._indexes.pop(key, None)
+                self._indexes[key] = entry
+                entry.refs += 1
+                self._evict()
+            return entry
+    
+    def _hold(self, key, fingerprint):
+        """Take a reference on a current entry and mark it recently used, or return None"""
+        entry = self._indexes.get(key)
+        if entry is None or entry.fingerprint != fingerprint:
+            return None
+        self._indexes.move_to_end(key)
+        entry.refs += 1
+        self.hits += 1
+        return entry
+    
+    def release(self, entry):
+        """Drop a reference taken by acquire"""
+        with self._lock:
+            entry.refs -= 1
+            self._evict()
+    
+    @contextmanager
+    def use(self, key, fingerprint, loader):
+        """Hold an index for the duration of a block, yielding its value"""
+        entry = self.acquire(key, fingerprint, loader)
+        try:
+            yield entry.value
+        finally:
+            self.release(entry)
+    
+    def _evict(self):
+        """Evict unused indexes, least recently used first, until the total size fits the budget"""
+        total = sum(entry.size for entry in self._indexes.values())
+        for key in list(self._indexes):
+            if total <= self.memory_budget:
+                break
+            entry = self._indexes[key]
+            if entry.refs > 0:
+                continue
+            del self._indexes[key]
+            total -= entry.size
+            self.evictions += 1
+            logger.info(f"Evicted index {key} ({entry.size / 2 ** 20:.1f} MB) over the memory budget")
+    
+    def invalidate(self, key):
+        """Forget an index, e.g. after its collection was deleted"""
+        with self._lock:
+            self._indexes.pop(key, None)
+    
+    def stats(self):
+        """Return counters and the memory used by loaded indexes"""
+        with self._lock:
+            return {
+                "services": sorted(self._services),
+                "indexes": len(self._indexes),
+                "index_bytes": sum(entry.size for entry in self._indexes.values()),
+                "memory_budget": self.memory_budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
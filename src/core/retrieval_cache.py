@@ -0,0 +1,101 @@
+import logging
+import threading
+from collections import OrderedDict
+from core.config import APP_CONFIG
+
+logger = logging.getLogger(__name__)
+
+_cache_instance = None
+_cache_instance_lock = threading.Lock()
+
+
+def get_retrieval_cache():
+    """Get the retrieval cache shared by the whole process"""
+    global _cache_instance
+    with _cache_instance_lock:
+        if _cache_instance is None:
+            _cache_instance = RetrievalCache()
+        return _cache_instance
+
+
+def normalize_query(query):
+    """Normalize the whitespace of a query"""
+    return " ".join(query.split())
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU mapping with hit/miss counters"""
+    
+    def __init__(self, max_entries):
+        """Initialize an empty cache holding at most max_entries items"""
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return the value for a key, or None"""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        """Store a value, evicting the least recently used items beyond the size limit"""
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+    
+    def stats(self):
+        """Return hit/miss counters and the current number of items"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._items)
+        }
+
+
+class RetrievalCache:
+    """In-process caches of query embeddings and top-k search results
+    
+    Results are keyed by (collection, index version, retrieval mode, query, k), so
+    they are never served from an index that has since been rebuilt.
+    """
+    
+    def __init__(self, max_entries=None):
+        """Initialize both caches with the same size limit"""
+        max_entries = max_entries or APP_CONFIG["retrieval_cache_max_entries"]
+        self.embeddings = LRUCache(max_entries)
+        self.results = LRUCache(max_entries)
+    
+    def get_embedding(self, model, query):
+        """Return the cached embedding of a query, or None"""
+        return self.embeddings.get((model, normalize_query(query)))
+    
+    def put_embedding(self, model, query, embedding):
+        """Cache the embedding of a query"""
+        self.embeddings.put((model, normalize_query(query)), embedding)
+    
+    def get_results(self, collection, index_version, query, k, mode="vector"):
+        """Return the cached search results of a query (e.g. its top-k candidates), or None"""
+        return self.results.get((collection, index_version, mode, normalize_query(query), k))
+    
+    def put_results(self, collection, index_version, query, k, documents, mode="vector"):
+        """Cache the search results of a query"""
+        self.results.put((collection, index_version, mode, normalize_query(query), k), tuple(documents))
+    
+    def stats(self):
+        """Return the statistics of both caches"""
+        return {
+            "embeddings": self.embeddings.stats(),
+            "results": self.results.stats()
+        }
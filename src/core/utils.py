@@ -1,6 +1,7 @@
 import logging
 import re
 import os
+import hashlib
 from streamlit_js_eval import streamlit_js_eval
 
 logger = logging.getLogger(__name__)
@@ -56,6 +57,25 @@ def sanitize_filename(filename):
     # Limit length
     return sanitized[:100]
 
+def url_to_filename(url, extension=".md"):
+    """
+    Build a stable, filesystem-safe filename from a URL
+    
+    Args:
+        url: Source URL of the page
+        extension: Extension to append
+        
+    Returns:
+        Filename derived from the URL host and path
+    """
+    name = re.sub(r'^[a-zA-Z]+://', "", url).rstrip("/")
+    name = re.sub(r'[^a-zA-Z0-9._-]+', "_", name).strip("_") or "index"
+    # Keep long names unique after truncation
+    if len(name) > 90:
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+        name = f"{name[:90]}_{digest}"
+    return name + extension
+
 def ensure_directory_exists(directory):
     """
     Ensure a directory exists, create it if it doesn't
@@ -115,6 +115,8 @@ class ScrapingJob:
     created_at: datetime = field(default_factory=datetime.now)
     completed_at: Optional[datetime] = None
     file_count: int = 0
+    total_urls: int = 0
+    completed_urls: int = 0
     
     def to_dict(self) -> dict:
         """Convert to a dictionary for storage"""
@@ -126,7 +128,9 @@ class ScrapingJob:
             "progress": self.progress,
             "message": self.message,
             "created_at": self.created_at.isoformat(),
-            "file_count": self.file_count
+            "file_count": self.file_count,
+            "total_urls": self.total_urls,
+            "completed_urls": self.completed_urls
         }
         
         if self.completed_at:
@@ -145,7 +149,9 @@ class ScrapingJob:
             progress=data.get("progress", 0.0),
             message=data.get("message", ""),
             created_at=datetime.fromisoformat(data.get("created_at", datetime.now().isoformat())),
-            file_count=data.get("file_count", 0)
+            file_count=data.get("file_count", 0),
+            total_urls=data.get("total_urls", 0),
+            completed_urls=data.get("completed_urls", 0)
         )
         
         if "completed_at" in data and data["completed_at"]:
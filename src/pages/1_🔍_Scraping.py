@@ -1,9 +1,16 @@
 import streamlit as st
 import os
 import time
-from services.scraping_service import ScrapingService
+from services.job_worker import start_worker_pool, submit_job
+from core.answer_cache import get_answer_cache
+from core.collection_catalog import CollectionCatalog
 from core.database import ScrapingProjectManager
-from core.config import PATHS
+from core.job_store import ScrapingJobManager
+from core.registry import get_registry
+from core.config import APP_CONFIG, PATHS
+
+# Status de jobs ainda em andamento ou interrompidos
+ACTIVE_STATUSES = ("pending", "mapping", "scraping", "scraped", "indexing")
 
 # Configuração da página
 st.set_page_config(
@@ -16,23 +23,24 @@ st.set_page_config(
 st.title("Web Scraping 🔍")
 st.write("Extraia conteúdo de sites para criar novas coleções de documentos.")
 
-# Inicializar serviços
-scraping_service = ScrapingService()
-project_manager = ScrapingProjectManager()
+# Serviços compartilhados pelo processo inteiro (todas as sessões e reruns)
+registry = get_registry()
+job_manager = registry.service("job_manager", ScrapingJobManager)
+project_manager = registry.service("project_manager", ScrapingProjectManager)
+catalog = registry.service("collection_catalog", CollectionCatalog)
+
+# Retomar os jobs de scraping pendentes de antes de um reinício do servidor
+start_worker_pool()
 
 # Inicializar estados da sessão
-if 'scraping_in_progress' not in st.session_state:
-    st.session_state.scraping_in_progress = False
-if 'scraping_progress' not in st.session_state:
-    st.session_state.scraping_progress = 0.0
-if 'scraping_status' not in st.session_state:
-    st.session_state.scraping_status = ""
 if 'viewing_document' not in st.session_state:
     st.session_state.viewing_document = False
 if 'view_collection' not in st.session_state:
     st.session_state.view_collection = None
 if 'view_file' not in st.session_state:
     st.session_state.view_file = None
+if 'submitted_job_ids' not in st.session_state:
+    st.session_state.submitted_job_ids = []
 
 # Tabs para as diferentes seções
 tab1, tab2, tab3 = st.tabs(["Nova Coleção", "Coleções Existentes", "Visualizar Documentos"])
@@ -69,50 +77,49 @@ with tab1:
             if os.path.exists(project_path) and not overwrite:
                 st.error(f"Uma coleção com o nome '{project_name}' já existe. Marque a opção para sobrescrever ou escolha outro nome.")
             else:
-                # Iniciar scraping
-                st.session_state.scraping_in_progress = True
-                st.session_state.scraping_progress = 0.0
-                st.session_state.scraping_status = "Iniciando..."
+                # Enviar o job para os workers em segundo plano (retomando um job interrompido, se houver)
+                job = job_manager.find_resumable(url, project_name) or job_manager.create_job(url, project_name)
+                submit_job(job.id, job_manager)
+                if job.id not in st.session_state.submitted_job_ids:
+                    st.session_state.submitted_job_ids.append(job.id)
+                st.success(f"Scraping de '{project_name}' iniciado em segundo plano. Você pode continuar usando o app.")
         
-        # Exibir progresso
-        if st.session_state.scraping_in_progress:
-            st.subheader("Progresso")
+        # Estado dos jobs, atualizado periodicamente sem reexecutar a página inteira
+        @st.fragment(run_every=APP_CONFIG["job_poll_interval"])
+        def render_jobs():
+            jobs = job_manager.list_jobs()
+            active_jobs = [job for job in jobs if job.status in ACTIVE_STATUSES]
+            recent_jobs = [job for job in jobs if job.status not in ACTIVE_STATUSES and (job.status == "failed" or job.id in st.session_state.submitted_job_ids)]
             
-            progress_bar = st.progress(st.session_state.scraping_progress)
-            status_text = st.empty()
-            status_text.write(st.session_state.scraping_status)
+            if active_jobs or recent_jobs:
+                st.subheader("Progresso")
             
-            # Processo de scraping
-            try:
-                def progress_callback(progress, status):
-                    st.session_state.scraping_progress = progress
-                    st.session_state.scraping_status = status
-                
-                # Executar processo de scraping
-                result = scraping_service.run_full_scraping_process(
-                    url=url,
-                    project_name=project_name,
-                    progress_callback=progress_callback
-                )
+            for job in active_jobs + recent_jobs:
+                running = job_manager.is_running(job.id)
+                st.write(f"**{job.project_name}** — {job.url} ({job.completed_urls}/{job.total_urls} URLs, {job.status})")
                 
-                # Atualizar UI com resultado
-                if result.get("success"):
-                    progress_bar.progress(1.0)
-                    status_text.success(f"Concluído! 90 arquivos salvos em '{project_name}'")
-                    
-                    # Adicionar botão para voltar para a página principal e usar coleção
-                    if st.button("Usar esta coleção no chat", use_container_width=True):
-                        st.session_state.selected_collection = project_name
+                if job.status == "completed":
+                    st.success(job.message)
+                    # Botão para voltar para a página principal e usar coleção
+                    if st.button("Usar esta coleção no chat", key=f"use_job_{job.id}", use_container_width=True):
+                        st.session_state.selected_collection = job.project_name
                         st.switch_page("Home.py")
+                elif job.status == "failed" or (not running and job.status != "pending"):
+                    # Jobs interrompidos podem ser retomados a partir do último checkpoint
+                    if job.status == "failed":
+                        st.error(job.message)
+                    else:
+                        st.warning(f"Job interrompido: {job.message}")
+                    if st.button("Retomar", key=f"resume_{job.id}", use_container_width=True):
+                        submit_job(job.id, job_manager)
+                        if job.id not in st.session_state.submitted_job_ids:
+                            st.session_state.submitted_job_ids.append(job.id)
+                        st.rerun(scope="fragment")
                 else:
-                    status_text.error(f"Erro: {result.get('error')}")
-                
-                # Resetar estado
-                st.session_state.scraping_in_progress = False
-                
-            except Exception as e:
-                status_text.error(f"Erro inesperado: {str(e)}")
-                st.session_state.scraping_in_progress = False
+                    st.progress(job.progress)
+                    st.caption(job.message)
+        
+        render_jobs()
 
 # Tab 2: Coleções Existentes
 with tab2:
@@ -165,8 +172,11 @@ with tab2:
                             import shutil
                             shutil.rmtree(project_path)
                         
-                        # Excluir do banco
+                        # Excluir do banco e descartar o índice carregado e as respostas em cache da coleção
                         project_manager.delete_project(project["id"])
+                        catalog.remove(project["name"])
+                        registry.invalidate(project_path)
+                        get_answer_cache().invalidate(project["name"])
                         st.success(f"Coleção '{project['name']}' excluída com sucesso.")
                         st.rerun()
 
@@ -181,8 +191,8 @@ with tab3:
     rag_dir = PATHS["rag_directory"]
     
     if os.path.exists(rag_dir):
-        collections = [d for d in os.listdir(rag_dir) 
-                     if os.path.isdir(os.path.join(rag_dir, d))]
+        # Coleções do catálogo, sem listar o diretório a cada execução
+        collections = [c["name"] for c in catalog.list_collections(include_empty=True)]
         
         if collections:
             # Seleção de coleção (use valor de state se disponível)
@@ -243,7 +253,7 @@ with tab3:
                                 st.text_area("Conteúdo do arquivo", content, height=400)
                             with content_tab2:
                                 st.markdown(content)
-                            
+                        
                         except Exception as e:
                             st.error(f"Erro ao ler o arquivo: {str(e)}")
                 else:
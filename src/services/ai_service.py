@@ -1,19 +1,49 @@
+import json
 import logging
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import AIMessageChunk
 from langchain_openai.chat_models import ChatOpenAI
 from core.config import APP_CONFIG
-import threading
+from core.database import ConversationManager
+from core.generation_scheduler import GenerationScheduler
+from core.prompt_builder import PromptBuilder
+from core.registry import get_registry
 
 logger = logging.getLogger(__name__)
 
+# Words with their trailing whitespace, so replayed chunks join back into the exact answer
+REPLAY_TOKEN_PATTERN = re.compile(r'\S+\s*|\s+')
+
+TITLE_MAX_WORDS = 5
+
+
+def heuristic_title(question):
+    """Build a title from the first words of the question, without calling a model"""
+    words = question.split()
+    return " ".join(words[:TITLE_MAX_WORDS]) + "..." if len(words) > TITLE_MAX_WORDS else question
+
+
+def _clean_title(title):
+    """Strip quotes and whitespace from a model-generated title and cut it to the word limit"""
+    words = title.strip().strip('"\'').split()
+    return " ".join(words[:TITLE_MAX_WORDS])
+
 class AIService:
     """Service for AI model interactions"""
     
-    def __init__(self):
+    def __init__(self, conversation_manager=None, scheduler=None):
         """Initialize AI models"""
+        # An OpenAI-compatible endpoint (e.g. a local fake server) replaces the OpenAI API when set
+        base_url = APP_CONFIG["openai_base_url"] or None
+        
         # Model for streaming chat responses
         self.chat_model = ChatOpenAI(
             temperature=APP_CONFIG["temperature"],
             model=APP_CONFIG["default_model"],
+            base_url=base_url,
             streaming=True
         )
         
@@ -21,16 +51,32 @@ class AIService:
         self.title_model = ChatOpenAI(
             temperature=APP_CONFIG["title_temperature"],
             model=APP_CONFIG["title_model"],
+            base_url=base_url,
             streaming=False
         )
         
+        # Chat generations of every session share one event loop and its concurrency limits
+        self.scheduler = scheduler or get_registry().service("generation_scheduler", GenerationScheduler)
+        
+        # Prompt assembly within token budgets; history summaries are cached per conversation
+        self.prompt_builder = PromptBuilder()
+        self.conversation_manager = conversation_manager or ConversationManager()
+        
+        # Titles of new conversations are generated by a few shared workers, several per model call
+        self._title_executor = ThreadPoolExecutor(
+            max_workers=APP_CONFIG["title_workers"], thread_name_prefix="title"
+        )
+        self._pending_titles = deque()
+        self._title_workers_busy = 0
+        self._title_lock = threading.Lock()
+        
         logger.info(f"AI service initialized with models: {APP_CONFIG['default_model']} and {APP_CONFIG['title_model']}")
     
     def generate_conversation_title(self, question):
         """Generate a concise and intelligent title for a conversation"""
         prompt = f"""
         Based on the following question, create a concise and relevant title for a conversation.
-        The title should have AT MOST 5 words and capture the essence of the question.
+        The title should have AT MOST {TITLE_MAX_WORDS} words and capture the essence of the question.
         
         Question: "{question}"
         
@@ -39,75 +85,159 @@ class AIService:
         
         try:
             response = self.title_model.invoke(prompt)
-            title = response.content.strip()
-            
-            # Check if the title is within limits
-            words = title.split()
-            if len(words) > 5:
-                title = " ".join(words[:5])
-            
-            return title
+            return _clean_title(response.content) or heuristic_title(question)
         except Exception as e:
             logger.error(f"Error generating title: {str(e)}")
             # In case of error, use a simple title
-            words = question.split()
-            return " ".join(words[:5]) + "..." if len(words) > 5 else question
+            return heuristic_title(question)
     
-    def process_title_async(self, question, callback):
-        """Process the title asynchronously and call the callback when done"""
+    def generate_conversation_titles(self, questions):
+        """Generate the titles of several conversations with a single model call"""
+        if len(questions) == 1:
+            return [self.generate_conversation_title(questions[0])]
+        
+        numbered = "\n".join(f"{i}. {json.dumps(question, ensure_ascii=False)}" for i, question in enumerate(questions, 1))
+        prompt = f"""
+        For each of the following questions, create a concise and relevant title for the conversation it starts.
+        Each title should have AT MOST {TITLE_MAX_WORDS} words and capture the essence of its question.
+        
+        Questions:
+        {numbered}
         
-        def worker():
-            # Generate the title using the LLM
-            title = self.generate_conversation_title(question)
+        Return ONLY a JSON array with one title per question, in the same order.
+        """
+        
+        try:
+            response = self.title_model.invoke(prompt)
+            content = response.content.strip().removeprefix("```json").strip("`").strip()
+            titles = json.loads(content)
+            if not isinstance(titles, list) or len(titles) != len(questions):
+                raise ValueError(f"expected {len(questions)} titles, got {content[:200]}")
+            return [
+                _clean_title(str(title)) or heuristic_title(question)
+                for title, question in zip(titles, questions)
+            ]
+        except Exception as e:
+            logger.error(f"Error generating {len(questions)} titles: {str(e)}")
+            return [heuristic_title(question) for question in questions]
+    
+    def request_title(self, conversation_id, question):
+        """Queue the generation of a conversation's title, saved with update_conversation_title when ready
+        
+        When more than title_max_pending titles are already waiting, the title is
+        built from the question's first words instead.
+        """
+        with self._title_lock:
+            if len(self._pending_titles) < APP_CONFIG["title_max_pending"]:
+                self._pending_titles.append((conversation_id, question))
+                if self._title_workers_busy < APP_CONFIG["title_workers"]:
+                    self._title_workers_busy += 1
+                    self._title_executor.submit(self._generate_pending_titles)
+                return
+        
+        logger.info(f"Title queue full, using the question as title for conversation {conversation_id}")
+        self.conversation_manager.update_conversation_title(conversation_id, heuristic_title(question))
+    
+    def _generate_pending_titles(self):
+        """Generate and save queued titles, a batch at a time, until the queue is empty"""
+        while True:
+            with self._title_lock:
+                if not self._pending_titles:
+                    self._title_workers_busy -= 1
+                    return
+                batch_size = min(len(self._pending_titles), APP_CONFIG["title_batch_size"])
+                batch = [self._pending_titles.popleft() for _ in range(batch_size)]
             
-            # Call the callback with the generated title
-            callback(title)
+            try:
+                titles = self.generate_conversation_titles([question for _, question in batch])
+                for (conversation_id, _), title in zip(batch, titles):
+                    self.conversation_manager.update_conversation_title(conversation_id, title)
+                logger.debug(f"Generated {len(batch)} conversation titles")
+            except Exception as e:
+                logger.error(f"Error saving conversation titles: {str(e)}")
+    
+    def summarize_history(self, chat_history, previous_summary=None):
+        """Summarize conversation messages, extending a previous summary if there is one"""
+        transcript = "".join(PromptBuilder.format_message(role, content) for role, content in chat_history)
+        max_words = int(APP_CONFIG["prompt_summary_tokens"] * 0.6)
+        prompt = f"""
+        Summarize the conversation below between a user and a documentation assistant in AT MOST {max_words} words.
+        Keep the user's goals, the facts and decisions established, and any names of APIs, functions or settings discussed.
+        
+        Summary so far: {previous_summary or "(none)"}
+        
+        Conversation:
+        {transcript}
+        
+        Return ONLY the updated summary.
+        """
         
-        # Start in a separate thread to avoid blocking the UI
-        thread = threading.Thread(target=worker)
-        thread.daemon = True
-        thread.start()
+        try:
+            response = self.title_model.invoke(prompt)
+            return response.content.strip()
+        except Exception as e:
+            logger.error(f"Error summarizing history: {str(e)}")
+            return previous_summary
     
-    def create_prompt_with_context(self, question, chat_history, documents):
-        """Create a prompt with context from documents and chat history"""
-        prompt_template = f"""
-        You are an experienced teacher and mentor specializing in the loaded documentation. You are deeply familiar with all the content of the documents and can explain them with clarity and depth.
-        
-        Your role is to:
-        1. Provide complete and accurate explanations based on the documentation
-        2. Help the user understand complex concepts with practical examples
-        3. Offer step-by-step guidance when requested
-        4. Share well-formatted and commented code examples when relevant
-        5. Respond in a clear, concise, and friendly manner
-        6. Never say "I don't know" or "I can't help" - always seek the best possible answer
-        
-        When sharing code:
-        - Use markdown code blocks (```) with the language specified
-        - Comment the code appropriately
-        - Explain the logic and purpose of the code
-        
-        Conversation history:
+    def _history_summary(self, conversation_id):
+        """Return (summary, recent messages) from the conversation's message log
+        
+        The summary is cached per conversation together with the id of the last
+        message it covers, so only messages logged after it are ever summarized,
+        however much of the conversation the session has loaded. A trailing user
+        message in the log is the question being answered and is left out.
         """
+        summary = None
+        last_message_id = 0
+        cached = self.conversation_manager.load_summary(conversation_id)
+        if cached:
+            summary = cached["summary"]
+            last_message_id = cached["last_message_id"]
         
-        # Add history pairs
-        history_pairs = []
-        for i in range(0, len(chat_history), 2):
-            if i+1 < len(chat_history):
-                user_msg = chat_history[i][1]
-                ai_msg = chat_history[i+1][1]
-                prompt_template += f"\nUser: {user_msg}\nAssistant: {ai_msg}\n"
+        messages = self.conversation_manager.load_messages_after(conversation_id, last_message_id)
+        if messages and messages[-1]["role"] == "user":
+            messages = messages[:-1]
+        chat_history = [(m["role"], m["content"]) for m in messages]
         
-        # Add current question
-        prompt_template += f"\nUser: {question}\n"
+        split = self.prompt_builder.split_history(chat_history)
+        if split > 0:
+            # Only the messages that just fell out of the window are summarized
+            summary = self.summarize_history(chat_history[:split], summary)
+            if summary:
+                self.conversation_manager.save_summary(conversation_id, summary, messages[split - 1]["id"])
+                logger.info(f"Summarized {split} more messages of conversation {conversation_id}")
         
-        # Add context from documents
-        prompt_template += "\nHere is relevant information from the documents that may help answer the question:\n"
-        for i, doc in enumerate(documents):
-            prompt_template += f"Document {i+1}:\n{doc.page_content}\n\n"
+        return summary, chat_history[split:]
+    
+    def create_prompt_with_context(self, question, chat_history, documents, conversation_id=None):
+        """Create a prompt with context from documents and chat history within the token budgets
         
-        prompt_template += "\nAssistant: "
-        return prompt_template
+        With a conversation_id, the history comes from the conversation's message log
+        (older messages replaced by their summary) instead of ``chat_history``.
+        """
+        summary = None
+        if conversation_id and chat_history:
+            summary, chat_history = self._history_summary(conversation_id)
+        
+        prompt = self.prompt_builder.build(question, chat_history, documents, summary)
+        logger.debug(f"Prompt built with {self.prompt_builder.count_tokens(prompt)} tokens")
+        return prompt
+    
+    def generate_streaming_response(self, prompt, user_id="default"):
+        """Generate a streaming response from the chat model
+        
+        The request waits for a slot in the shared generation scheduler, queued
+        fairly with the other requests of user_id. Empty chunks are yielded while it
+        waits; closing the returned generator cancels the request.
+        """
+        return self.scheduler.stream(
+            user_id,
+            lambda: self.chat_model.astream(prompt),
+            keepalive=AIMessageChunk(content="")
+        )
     
-    def generate_streaming_response(self, prompt):
-        """Generate a streaming response from the chat model"""
-        return self.chat_model.stream(prompt)
\ No newline at end of file
+    def replay_response(self, answer, words_per_chunk=4):
+        """Replay a cached answer through the same chunk interface as a streaming response"""
+        pieces = REPLAY_TOKEN_PATTERN.findall(answer)
+        for i in range(0, len(pieces), words_per_chunk):
+            yield AIMessageChunk(content="".join(pieces[i:i + words_per_chunk]))
\ No newline at end of file
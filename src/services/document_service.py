@@ -1,95 +1,635 @@
+import glob
+import html
 import logging
 import os
-from langchain_community.document_loaders import DirectoryLoader, UnstructuredMarkdownLoader
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+from langchain_core.documents import Document
 from langchain_openai.embeddings import OpenAIEmbeddings
 from langchain_community.vectorstores import FAISS
-from core.config import APP_CONFIG, PATHS
-import streamlit as st
+from core.config import APP_CONFIG
+from core.ann_index import FLAT_SETTINGS, build_index, select_index_settings, stored_vectors, supports_removal
+from core.answer_cache import get_answer_cache
+from core.chunking import FENCE_PATTERN, HEADING_PATTERN, MarkdownChunker
+from core.collection_catalog import CollectionCatalog
+from core.database import ConversationManager
+from core.embedding_cache import CachedEmbeddings
+from core.index_store import IndexStore
+from core.lexical_index import reciprocal_rank_fusion
+from core.registry import get_registry
+from core.retrieval_cache import get_retrieval_cache
 
 logger = logging.getLogger(__name__)
 
+# Query embeddings run here so a slow embedding API can be timed out
+_query_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="query-embedding")
+# Searches of the collections of a multi-collection query run in parallel (FAISS and numpy release the GIL)
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="collection-search")
+
+RETRIEVAL_MODES = ("hybrid", "vector", "lexical")
+
+SETEXT_PATTERN = re.compile(r'^(=+|-+)$')
+RULE_PATTERN = re.compile(r'^([-*_])([ \t]*\1){2,}$')
+LINK_DEFINITION_PATTERN = re.compile(r'^\[[^\]]+\]:\s*\S+')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\|?[ \t]*:?-+:?[ \t]*(\|[ \t]*:?-+:?[ \t]*)*\|?$')
+BLOCK_PREFIX_PATTERN = re.compile(r'^(>[ \t]?)+|^([-*+]|\d+[.)])[ \t]+(\[[ xX]\][ \t]+)?')
+CODE_SPAN_PATTERN = re.compile(r'(`+)(.+?)\1')
+INLINE_PATTERNS = [
+    (re.compile(r'!\[([^\]]*)\]\([^)]*\)'), r'\1'),                 # images
+    (re.compile(r'\[([^\]]+)\]\([^)]*\)'), r'\1'),                  # links
+    (re.compile(r'\[([^\]]+)\]\[[^\]]*\]'), r'\1'),                # reference links
+    (re.compile(r'<((?:https?|mailto):[^>]+)>'), r'\1'),           # autolinks
+    (re.compile(r'</?[a-zA-Z][^>\n]*>'), ''),                      # inline HTML
+    (re.compile(r'(\*\*|__)(?=\S)(.+?)(?<=\S)\1'), r'\2'),           # bold
+    (re.compile(r'(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])'), r'\1'),  # italic
+    (re.compile(r'(?<!\w)_(?=\S)(.+?)(?<=\S)_(?!\w)'), r'\1'),       # italic
+    (re.compile(r'~~(.+?)~~'), r'\1'),                              # strikethrough
+]
+
+
+class MarkdownLoader:
+    """Lightweight markdown loader that strips syntax down to retrievable text
+    
+    Heading lines keep their ``#`` markers and fenced code blocks keep their fences,
+    so the chunker can still split on document structure.
+    """
+    
+    version = 1
+    
+    def __init__(self, max_workers=None):
+        """Initialize the loader with the size of the directory thread pool"""
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    
+    def load_file(self, file_path):
+        """Load a markdown file as a Document with its headings as metadata"""
+        # A single bulk read; decoding and parsing happen in memory
+        with open(file_path, "rb") as f:
+            text = f.read().decode("utf-8", errors="replace")
+        
+        headings = []
+        content = "\n".join(self.parse(text, headings))
+        
+        return Document(
+            page_content=content,
+            metadata={"source": file_path, "headings": headings}
+        )
+    
+    def load_directory(self, directory_path, pattern="**/*.md"):
+        """Load every markdown file of a directory in parallel"""
+        # glob skips hidden directories such as the index directory
+        file_paths = sorted(glob.glob(os.path.join(directory_path, pattern), recursive=True))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.load_file, file_paths))
+    
+    def parse(self, text, headings=None):
+        """Yield the lines of a markdown text with block and inline syntax removed
+        
+        Heading titles are appended to ``headings`` when a list is given.
+        """
+        fence = None
+        in_comment = False
+        pending = None      # last paragraph line, held back in case a setext underline follows
+        blank = True
+        
+        for line in text.splitlines():
+            # Code is kept verbatim: identifiers in it are what users search for
+            if fence:
+                if pending is not None:
+                    yield pending
+                    pending = None
+                yield line
+                if line.strip().startswith(fence):
+                    fence = None
+                continue
+            
+            match = FENCE_PATTERN.match(line)
+            if match:
+                if pending is not None:
+                    yield pending
+                    pending = None
+                fence = match.group(1)
+                blank = False
+                yield line.strip()
+                continue
+            
+            if in_comment:
+                if "-->" not in line:
+                    continue
+                line = line.split("-->", 1)[1]
+                in_comment = False
+            while "<!--" in line:
+                before, _, after = line.partition("<!--")
+                if "-->" not in after:
+                    line = before
+                    in_comment = True
+                    break
+                line = before + after.split("-->", 1)[1]
+            
+            stripped = line.strip()
+            
+            if pending is not None and stripped and SETEXT_PATTERN.match(stripped):
+                level = 1 if stripped[0] == "=" else 2
+                if headings is not None:
+                    headings.append(pending)
+                yield f"{'#' * level} {pending}"
+                pending = None
+                continue
+            if pending is not None:
+                yield pending
+                pending = None
+            
+            if not stripped:
+                if not blank:
+                    yield ""
+                blank = True
+                continue
+            if RULE_PATTERN.match(stripped) or LINK_DEFINITION_PATTERN.match(stripped) or TABLE_SEPARATOR_PATTERN.match(stripped):
+                continue
+            blank = False
+            
+            match = HEADING_PATTERN.match(stripped)
+            if match:
+                title = self.strip_inline(match.group(2))
+                if headings is not None:
+                    headings.append(title)
+                yield f"{match.group(1)} {title}"
+                continue
+            
+            content = self.strip_inline(BLOCK_PREFIX_PATTERN.sub("", stripped))
+            if content.startswith("|"):
+                content = " | ".join(cell.strip() for cell in content.strip("|").split("|"))
+            if content:
+                pending = content
+        
+        if pending is not None:
+            yield pending
+    
+    def strip_inline(self, text):
+        """Remove inline markdown from a line, leaving code spans untouched"""
+        parts = []
+        position = 0
+        for match in CODE_SPAN_PATTERN.finditer(text):
+            parts.append(self._strip_inline_markup(text[position:match.start()]))
+            parts.append(match.group(2).strip())
+            position = match.end()
+        parts.append(self._strip_inline_markup(text[position:]))
+        return "".join(parts)
+    
+    def _strip_inline_markup(self, text):
+        """Apply the inline patterns to text outside code spans"""
+        for pattern, replacement in INLINE_PATTERNS:
+            text = pattern.sub(replacement, text)
+        return html.unescape(text)
+
+
 class DocumentService:
     """Service for document loading and vector store operations"""
     
     def __init__(self):
         """Initialize document service"""
-        self.embeddings = OpenAIEmbeddings()
+        # Every embedding call (indexing and queries) goes through the local cache first;
+        # retries are left to the embedding scheduler, which honours Retry-After
+        self.embeddings = CachedEmbeddings(
+            OpenAIEmbeddings(model=APP_CONFIG["embedding_model"], max_retries=0),
+            APP_CONFIG["embedding_model"]
+        )
+        self.loader = MarkdownLoader()
+        self.chunker = MarkdownChunker()
+        self.retrieval_cache = get_retrieval_cache()
+        # Loaded indexes and the collection catalog are shared by every session of the process
+        self.registry = get_registry()
+        self.catalog = self.registry.service("collection_catalog", CollectionCatalog)
+        # Readiness of the collections warmed up by prewarm, by name
+        self.warmup_status = {}
         logger.info("Document service initialized")
     
-    @st.cache_resource
-    def load_documents_from_directory(_self, directory_path):
-        """Load all markdown documents from a directory and return them"""
-        try:
-            loader = DirectoryLoader(
-                directory_path,
-                glob="**/*.md",
-                loader_cls=UnstructuredMarkdownLoader
-            )
-            
-            docs = loader.load()
-            logger.info(f"Loaded {len(docs)} documents from {directory_path}")
-            return docs
-        except Exception as e:
-            logger.error(f"Error loading documents: {str(e)}")
-            raise
+    def _load_file(self, file_path):
+        """Load the documents of a single markdown file"""
+        return [self.loader.load_file(file_path)]
     
-    def create_vector_store(self, documents):
+    def _index_settings(self):
+        """Options that invalidate the whole index when they change"""
+        return {
+            "embedding_model": APP_CONFIG["embedding_model"],
+            "loader_version": self.loader.version,
+            "chunk_size": self.chunker.chunk_size,
+            "chunk_overlap": self.chunker.chunk_overlap
+        }
+    
+    def create_vector_store(self, documents, ids=None):
         """Create a vector store from documents"""
         try:
-            # Remove o cache para evitar problemas com o parâmetro 'documents'
-            vector_store = FAISS.from_documents(documents, self.embeddings)
+            if not documents:
+                raise ValueError("No documents to index")
+            vector_store = self._add_documents(None, documents, ids or [str(uuid.uuid4()) for _ in documents])
             logger.info(f"Created vector store with {len(documents)} documents")
             return vector_store
         except Exception as e:
             logger.error(f"Error creating vector store: {str(e)}")
             raise
     
-    def get_retriever(self, vector_store, k=None):
-        """Get a retriever from a vector store"""
-        if k is None:
-            k = APP_CONFIG["retriever_k"]
+    def _add_documents(self, vector_store, documents, ids):
+        """Embed documents batch by batch, adding each finished batch to the vector store
+        
+        A new vector store is created from the first batch when ``vector_store`` is None.
+        """
+        texts = [doc.page_content for doc in documents]
+        for positions, vectors in self.embeddings.embed_documents_stream(texts):
+            text_embeddings = [(texts[i], vector) for i, vector in zip(positions, vectors)]
+            metadatas = [documents[i].metadata for i in positions]
+            batch_ids = [ids[i] for i in positions]
+            
+            if vector_store is None:
+                vector_store = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas, ids=batch_ids)
+            else:
+                vector_store.add_embeddings(text_embeddings, metadatas=metadatas, ids=batch_ids)
+        
+        return vector_store
+    
+    def acquire_index(self, collection_path):
+        """Hold a collection's index in the registry, loading or building it as needed
         
-        return vector_store.as_retriever(search_kwargs={"k": k})
+        The returned registry entry's ``value`` has the index ``version``, the
+        ``vector_store`` and the ``lexical_index``; release it with ``registry.release``.
+        A change to the collection's files is detected on the next acquire.
+        """
+        store = IndexStore(collection_path)
+        files = store.scan_files()
+        return self.registry.acquire(collection_path, files, lambda: self._load_index(store, files))
     
-    def retrieve_relevant_documents(self, retriever, query):
-        """Retrieve relevant documents for a query"""
+    def _load_index(self, store, files):
+        """Load a collection's persisted index, updating it first if stale; returns (index, size in bytes)"""
+        collection_path = store.collection_path
         try:
-            docs = retriever.get_relevant_documents(query)
-            logger.info(f"Retrieved {len(docs)} relevant documents for query")
-            return docs
+            # Other processes (indexing workers, bin/prewarm.py) may update the same index
+            with store.lock():
+                manifest = store.load_manifest()
+                if manifest and manifest.get("settings") != self._index_settings():
+                    logger.info(f"Index settings changed for {collection_path}, rebuilding from scratch")
+                    manifest = None
+                
+                if store.is_current(manifest, files):
+                    vector_store = store.load(self.embeddings)
+                else:
+                    logger.info(f"Index for {collection_path} is missing or stale, updating")
+                    vector_store, manifest = self._update_index(store, manifest, files)
+                    # Answers generated from the previous index are stale
+                    get_answer_cache().invalidate(os.path.basename(os.path.normpath(collection_path)))
+                lexical_index = store.load_lexical(vector_store)
+                self.catalog.set_index_version(os.path.basename(os.path.normpath(collection_path)), manifest["version"])
         except Exception as e:
-            logger.error(f"Error retrieving documents: {str(e)}")
+            logger.error(f"Error getting vector store for {collection_path}: {str(e)}")
             raise
+        
+        index = {
+            "version": manifest["version"],
+            "vector_store": vector_store,
+            "lexical_index": lexical_index
+        }
+        return index, store.disk_size()
     
-    def get_available_rag_collections(self):
-        """Get all available RAG collections"""
-        rag_dir = PATHS["rag_directory"]
-        collections = []
+    def refresh_index(self, collection_path):
+        """Bring a collection's persisted index up to date without keeping it loaded in this process"""
+        store = IndexStore(collection_path)
+        index, _ = self._load_index(store, store.scan_files())
+        return index["version"]
+    
+    def prewarm_targets(self):
+        """Collections to warm up: the configured list, or else the ones with the most conversations"""
+        if APP_CONFIG["prewarm_collections"]:
+            return APP_CONFIG["prewarm_collections"]
+        if APP_CONFIG["prewarm_top_collections"] <= 0:
+            return []
+        conversation_manager = self.registry.service("conversation_manager", ConversationManager)
+        return conversation_manager.most_used_collections(APP_CONFIG["prewarm_top_collections"])
+    
+    def prewarm(self, names=None, keep_loaded=True):
+        """Load or build the indexes of several collections in parallel, returning each one's readiness
+        
+        With ``keep_loaded`` the indexes stay in the registry so this process serves
+        them without a cold start; without it only the persisted indexes are brought
+        up to date, as a deploy step before the server starts.
+        """
+        names = self.prewarm_targets() if names is None else names
+        if not names:
+            return {}
+        
+        logger.info(f"Warming up {len(names)} collections: {', '.join(names)}")
+        with ThreadPoolExecutor(max_workers=APP_CONFIG["prewarm_workers"], thread_name_prefix="prewarm") as executor:
+            results = dict(zip(names, executor.map(lambda name: self._warm_collection(name, keep_loaded), names)))
         
+        ready = sum(result["ready"] for result in results.values())
+        logger.info(f"Warm-up finished: {ready}/{len(results)} collections ready")
+        return results
+    
+    def start_prewarm(self):
+        """Run prewarm for the configured collections in a background thread, returning the thread"""
+        thread = threading.Thread(target=self.prewarm, name="prewarm", daemon=True)
+        thread.start()
+        return thread
+    
+    def _warm_collection(self, name, keep_loaded):
+        """Load or build one collection's index and record its readiness and warm-up time"""
+        self.warmup_status[name] = {"ready": False, "state": "warming"}
+        start = time.perf_counter()
         try:
-            if not os.path.exists(rag_dir):
-                os.makedirs(rag_dir, exist_ok=True)
-                logger.info(f"Created RAG directory: {rag_dir}")
-                return []
-                
-            for item in os.listdir(rag_dir):
-                item_path = os.path.join(rag_dir, item)
-                if os.path.isdir(item_path):
-                    # Check if directory contains markdown files
-                    try:
-                        md_files = [f for f in os.listdir(item_path) 
-                                  if f.endswith('.md') and os.path.isfile(os.path.join(item_path, f))]
-                        
-                        if md_files:
-                            collections.append({
-                                "name": item,
-                                "path": item_path,
-                                "file_count": len(md_files)
-                            })
-                    except Exception as e:
-                        logger.error(f"Error processing directory {item_path}: {str(e)}")
+            collection = self.catalog.get_collection(name)
+            if collection is None:
+                raise ValueError(f"Collection not found: {name}")
             
-            return collections
+            if keep_loaded:
+                entry = self.acquire_index(collection["path"])
+                self.registry.release(entry)
+                index = entry.value
+            else:
+                store = IndexStore(collection["path"])
+                index, _ = self._load_index(store, store.scan_files())
+            
+            status = {
+                "ready": True,
+                "state": "ready",
+                "seconds": time.perf_counter() - start,
+                "version": index["version"],
+                "vectors": index["vector_store"].index.ntotal
+            }
+            logger.info(f"Collection {name} ready in {status['seconds']:.2f}s ({status['vectors']} vectors)")
+        except Exception as e:
+            status = {"ready": False, "state": "failed", "seconds": time.perf_counter() - start, "error": str(e)}
+            logger.error(f"Error warming up collection {name}: {str(e)}")
+        
+        self.warmup_status[name] = status
+        return status
+    
+    @contextmanager
+    def hold_indexes(self, collection_paths):
+        """Hold the indexes of several collections for the duration of a block, yielding {path: index}
+        
+        Each collection is acquired once, in parallel; use the yielded indexes for every
+        lookup of the block (versions, searches) instead of acquiring them again, since
+        each acquire scans the collection's files.
+        """
+        acquisitions = [_search_executor.submit(self.acquire_index, path) for path in collection_paths]
+        try:
+            yield {path: future.result().value for path, future in zip(collection_paths, acquisitions)}
+        finally:
+            for future in acquisitions:
+                if future.exception() is None:
+                    self.registry.release(future.result())
+    
+    def _update_index(self, store, manifest, files):
+        """Bring a collection's index in line with its files, embedding only new or changed chunks"""
+        indexed_files = manifest["files"] if manifest and store.has_index() else {}
+        vector_store = store.load(self.embeddings, mmap=False) if indexed_files else None
+        
+        current_files = {}
+        new_chunks = []
+        new_ids = []
+        stale_ids = []
+        
+        for relative_path, stat in files.items():
+            entry = indexed_files.get(relative_path)
+            if entry and entry["size"] == stat["size"] and entry["mtime_ns"] == stat["mtime_ns"]:
+                current_files[relative_path] = entry
+                continue
+            
+            # Touched files whose content did not change keep their vectors
+            file_path = os.path.join(store.collection_path, relative_path)
+            file_hash = IndexStore.hash_file(file_path)
+            if entry and entry["hash"] == file_hash:
+                current_files[relative_path] = {**entry, **stat}
+                continue
+            
+            chunks = self.chunker.split_documents(self._load_file(file_path))
+            chunk_ids = IndexStore.chunk_ids(relative_path, chunks)
+            previous_ids = set(entry["chunks"]) if entry else set()
+            for chunk, chunk_id in zip(chunks, chunk_ids):
+                if chunk_id not in previous_ids:
+                    new_chunks.append(chunk)
+                    new_ids.append(chunk_id)
+                else:
+                    # Same content, but edits elsewhere in the file may have moved it: keep
+                    # its vector and take the offsets and position from the new chunking pass
+                    vector_store.docstore.search(chunk_id).metadata = chunk.metadata
+            stale_ids.extend(previous_ids.difference(chunk_ids))
+            current_files[relative_path] = {**stat, "hash": file_hash, "chunks": chunk_ids}
+        
+        for relative_path in indexed_files.keys() - files.keys():
+            stale_ids.extend(indexed_files[relative_path]["chunks"])
+        
+        # The index type follows the size the collection will have after this update
+        vector_count = sum(len(entry["chunks"]) for entry in current_files.values())
+        ann = select_index_settings(vector_count)
+        removed_ids = []
+        
+        if vector_store is None:
+            # New vectors are added to an exact flat index first, converted below if needed
+            vector_store = self.create_vector_store(new_chunks, ids=new_ids)
+            current_ann = FLAT_SETTINGS
+        else:
+            current_ann = manifest.get("ann", FLAT_SETTINGS)
+            if stale_ids:
+                if current_ann == ann and supports_removal(vector_store.index):
+                    vector_store.delete(stale_ids)
+                else:
+                    # Removed while rebuilding the index
+                    removed_ids = stale_ids
+            if new_chunks:
+                self._add_documents(vector_store, new_chunks, new_ids)
+        
+        if current_ann != ann or removed_ids:
+            self._rebuild_index(vector_store, ann, removed_ids)
+        
+        logger.info(
+            f"Index update for {store.collection_path}: {len(new_chunks)} chunks embedded, "
+            f"{len(stale_ids)} removed"
+        )
+        manifest = store.save(vector_store, current_files, self._index_settings(), ann)
+        return vector_store, manifest
+    
+    def _rebuild_index(self, vector_store, ann, removed_ids=()):
+        """Replace a vector store's FAISS index with a new one of the given type, leaving out removed_ids
+        
+        Vectors are read back from the current index when it stores them exactly and
+        otherwise taken from the embedding cache, so the API is only called for
+        vectors the cache no longer holds.
+        """
+        removed = set(removed_ids)
+        mapping = vector_store.index_to_docstore_id
+        positions = [position for position in sorted(mapping) if mapping[position] not in removed]
+        ids = [mapping[position] for position in positions]
+        
+        vectors = stored_vectors(vector_store.index)
+        if vectors is not None:
+            vectors = vectors[positions]
+        else:
+            texts = [vector_store.docstore.search(doc_id).page_content for doc_id in ids]
+            vectors = self.embeddings.embed_documents(texts)
+        
+        vector_store.index = build_index(vectors, ann, dimension=vector_store.index.d)
+        vector_store.index_to_docstore_id = dict(enumerate(ids))
+        if removed:
+            vector_store.docstore.delete(list(removed))
+        logger.info(f"Rebuilt {ann['type']} index ({ann['quantization']} quantization) with {len(ids)} vectors")
+    
+    def embed_query(self, query, timeout=None):
+        """Embed a query, reusing the embeddings of recent queries held in memory
+        
+        With a timeout, concurrent.futures.TimeoutError is raised when the embedding
+        API does not answer in time; the request keeps running and still fills the cache.
+        """
+        embedding = self.retrieval_cache.get_embedding(APP_CONFIG["embedding_model"], query)
+        if embedding is None:
+            future = _query_executor.submit(self._embed_and_cache, query)
+            embedding = future.result(timeout=timeout)
+        return embedding
+    
+    def _embed_and_cache(self, query):
+        """Embed a query with the embedding API and cache the result"""
+        embedding = self.embeddings.embed_query(query)
+        self.retrieval_cache.put_embedding(APP_CONFIG["embedding_model"], query, embedding)
+        return embedding
+    
+    @staticmethod
+    def _vector_candidates(vector_store, embedding, limit):
+        """Return (docstore id, L2 distance) pairs of the nearest chunks to an embedding, nearest first"""
+        distances, indices = vector_store.index.search(np.asarray([embedding], dtype=np.float32), limit)
+        return [
+            (vector_store.index_to_docstore_id[i], float(distance))
+            for i, distance in zip(indices[0], distances[0]) if i != -1
+        ]
+    
+    def _query_embedding(self, query, mode):
+        """Embed a query for a retrieval mode, returning (embedding or None, degraded)
+        
+        In hybrid mode, a query embedding that fails or exceeds query_embedding_timeout
+        degrades the search to lexical results only.
+        """
+        if mode == "lexical":
+            return None, False
+        if mode == "vector":
+            return self.embed_query(query), False
+        try:
+            return self.embed_query(query, timeout=APP_CONFIG["query_embedding_timeout"]), False
+        except Exception as e:
+            logger.warning(f"Query embedding unavailable, using lexical results only: {e!r}")
+            return None, True
+    
+    def _candidates(self, index, query, limit, mode, embedding):
+        """Return one collection's (lexical, vector) candidate lists of (docstore id, document, raw score)
+        
+        Lexical candidates carry their BM25 score (higher is better), vector candidates
+        their L2 distance to the query embedding (lower is better).
+        """
+        vector_store = index["vector_store"]
+        lexical = []
+        if mode in ("hybrid", "lexical"):
+            lexical = index["lexical_index"].scored_search(query, limit)
+        vector = []
+        if embedding is not None:
+            vector = self._vector_candidates(vector_store, embedding, limit)
+        return (
+            tuple((doc_id, vector_store.docstore.search(doc_id), score) for doc_id, score in lexical),
+            tuple((doc_id, vector_store.docstore.search(doc_id), score) for doc_id, score in vector)
+        )
+    
+    @staticmethod
+    def _fuse_candidates(candidates, k):
+        """Fuse the candidate lists of one or more collections into a single top-k of (document, score)
+        
+        BM25 scores depend on each collection's own term statistics, so every
+        collection's lexical candidates stay a separate ranking; the vector candidates
+        are ranked together by distance to the query, which the shared embedding model
+        makes comparable across collections. One reciprocal rank fusion over the
+        per-collection lexical rankings and the global vector ranking then gives the
+        final order.
+        """
+        documents = {}
+        rankings = []
+        vector = []
+        for collection_path, (collection_lexical, collection_vector) in candidates.items():
+            # Lexical candidates are already in descending BM25 order
+            if collection_lexical:
+                rankings.append([(collection_path, doc_id) for doc_id, _, _ in collection_lexical])
+            for doc_id, doc, _ in collection_lexical:
+                documents[(collection_path, doc_id)] = doc
+            for doc_id, doc, distance in collection_vector:
+                documents[(collection_path, doc_id)] = doc
+                vector.append((distance, (collection_path, doc_id)))
+        
+        if vector:
+            rankings.append([key for _, key in sorted(vector, key=lambda item: item[0])])
+        fused = reciprocal_rank_fusion(rankings, APP_CONFIG["rrf_k"])[:k]
+        return [(documents[key], score) for key, score in fused]
+    
+    def search_collections(self, collection_paths, query, k=None, mode=None, indexes=None):
+        """Return the top-k (document, score) pairs for a query across one or more collections
+        
+        ``mode`` is "hybrid" (BM25 and vector rankings fused with reciprocal rank
+        fusion), "vector" or "lexical". The query is embedded once and the collections
+        are searched in parallel, each on its shared in-process index; per-collection
+        candidate lists are served from the retrieval cache when possible and fused
+        together (see _fuse_candidates). ``indexes`` are indexes already held with
+        hold_indexes; by default they are acquired for the duration of the search.
+        """
+        if k is None:
+            k = APP_CONFIG["retriever_k"]
+        mode = mode or APP_CONFIG["retrieval_mode"]
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+        limit = max(k, APP_CONFIG["retrieval_candidates"])
+        
+        if indexes is None:
+            # Every index is held until the search is done, so none is evicted mid-query
+            with self.hold_indexes(collection_paths) as indexes:
+                return self.search_collections(collection_paths, query, k, mode, indexes)
+        
+        try:
+            # Candidate lists are cached per collection; fusing them is cheap
+            candidates = {}
+            missing = []
+            for collection_path in collection_paths:
+                index_version = indexes[collection_path]["version"]
+                cached = self.retrieval_cache.get_results(collection_path, index_version, query, limit, mode)
+                if cached is None:
+                    missing.append(collection_path)
+                else:
+                    candidates[collection_path] = cached
+            
+            if missing:
+                embedding, degraded = self._query_embedding(query, mode)
+                searched = _search_executor.map(
+                    lambda path: self._candidates(indexes[path], query, limit, mode, embedding), missing
+                )
+                for collection_path, collection_candidates in zip(missing, searched):
+                    candidates[collection_path] = collection_candidates
+                    # Degraded results are not cached, so the next query gets the full ranking
+                    if not degraded:
+                        index_version = indexes[collection_path]["version"]
+                        self.retrieval_cache.put_results(
+                            collection_path, index_version, query, limit, collection_candidates, mode
+                        )
+            
+            ranking = self._fuse_candidates(candidates, k)
+            
+            stats = self.retrieval_cache.stats()["results"]
+            logger.info(
+                f"Retrieved {len(ranking)} documents from {len(collection_paths)} collection(s) "
+                f"({mode}, cache hit rate {stats['hit_rate']:.0%})"
+            )
+            return ranking
+        except Exception as e:
+            logger.error(f"Error searching {', '.join(collection_paths)}: {str(e)}")
+            raise
+    
+    def get_available_rag_collections(self):
+        """Get all available RAG collections (with markdown files) from the collection catalog"""
+        try:
+            return self.catalog.list_collections()
         except Exception as e:
             logger.error(f"Error getting RAG collections: {str(e)}")
             return []
@@ -0,0 +1,224 @@
+"""Background execution of scraping jobs (scrape -> chunk -> embed -> index).
+
+Jobs are run in worker processes so that a long scraping or indexing run never
+blocks the Streamlit script. The job state on disk (see ``core.job_store``) is the
+only channel between the UI and the workers: the UI submits a job and polls its
+``job.json``, the worker claims it, updates it as it progresses and releases it.
+
+Two modes are supported (``JOB_RUNNER``):
+
+* ``pool`` (default): jobs are submitted to a process pool owned by the Streamlit
+  server process.
+* ``external``: the UI only enqueues jobs and a standalone worker picks them up::
+
+      cd src && python -m services.job_worker
+
+In ``pool`` mode, jobs left pending by a server restart are resubmitted when the
+pages start the pool (``start_worker_pool``) on their first run. Data paths are
+resolved in ``core.config``, so every entry point shares the same data directory
+whatever its working directory.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from core.config import APP_CONFIG, PATHS
+from core.job_store import ScrapingJobManager
+from core.registry import get_registry
+
+logger = logging.getLogger(__name__)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _create_pool(max_workers=None):
+    """Create a process pool; workers are spawned so they never inherit the parent's threads"""
+    return ProcessPoolExecutor(
+        max_workers=max_workers or APP_CONFIG["worker_processes"],
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def get_worker_pool():
+    """Get the process pool shared by the whole server process"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = _create_pool()
+            # Jobs queued before a server restart are picked up again
+            for job in ScrapingJobManager().list_jobs(statuses=("pending",)):
+                _pool.submit(run_job, job.id).add_done_callback(_log_failure(job.id))
+        return _pool
+
+
+def start_worker_pool():
+    """Start the server's worker pool, resubmitting pending jobs, when jobs run in the pool"""
+    if APP_CONFIG["job_runner"] == "pool":
+        get_worker_pool()
+
+
+class ProgressiveIndexer:
+    """Index a collection in the background while its pages are still being scraped
+    
+    Scraped pages are reported through ``file_saved``; every ``interval`` seconds, if
+    any page changed, the collection's index is refreshed. Only new or changed
+    chunks are embedded, so the collection becomes searchable progressively and the
+    final indexing stage is left with the last pages only.
+    """
+    
+    def __init__(self, document_service, collection_path, interval=None):
+        """Initialize the indexer for one collection"""
+        self.document_service = document_service
+        self.collection_path = collection_path
+        self.interval = APP_CONFIG["progressive_index_interval"] if interval is None else interval
+        self.refreshes = 0
+        self._changed = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def file_saved(self, file_path, changed):
+        """Record a scraped page (the on_file_saved hook of ScrapingService)"""
+        if changed:
+            self._changed.set()
+    
+    def start(self):
+        """Start refreshing in a background thread, unless progressive indexing is disabled"""
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="progressive-indexer", daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop refreshing, waiting for a refresh in progress to finish"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def _run(self):
+        """Refresh the index every interval while pages keep changing"""
+        while not self._stopped.wait(self.interval):
+            if not self._changed.is_set():
+                continue
+            self._changed.clear()
+            try:
+                self.document_service.refresh_index(self.collection_path)
+                self.refreshes += 1
+            except Exception as e:
+                # The final indexing stage retries and reports the error
+                logger.warning(f"Progressive indexing of {self.collection_path} failed: {str(e)}")
+
+
+def run_job(job_id):
+    """Run a scraping job end to end and index the resulting collection"""
+    # Imported here so the pool workers only load the heavy dependencies they use
+    from services.document_service import DocumentService
+    from services.scraping_service import ScrapingService
+    
+    registry = get_registry()
+    job_manager = registry.service("job_manager", ScrapingJobManager)
+    if not job_manager.claim_job(job_id):
+        logger.info(f"Job {job_id} is already running in another process")
+        return None
+    
+    try:
+        job = job_manager.load_job(job_id)
+        if job is None or job.status == "completed":
+            logger.info(f"Job {job_id} has nothing left to run")
+            return None
+        
+        collection_path = os.path.join(PATHS["rag_directory"], job.project_name)
+        document_service = registry.service("document_service", DocumentService)
+        indexer = ProgressiveIndexer(document_service, collection_path).start()
+        try:
+            result = registry.service("scraping_service", ScrapingService).run_scraping_job(
+                job, complete=False, on_file_saved=indexer.file_saved
+            )
+        finally:
+            indexer.stop()
+        if not result["success"]:
+            return result
+        
+        job.status = "indexing"
+        job.message = f"Indexing {job.file_count} files..."
+        job_manager.save_job(job)
+        
+        try:
+            start = time.perf_counter()
+            # Built on disk only: the app loads the index into its own registry when it is used
+            document_service.refresh_index(collection_path)
+            logger.info(
+                f"Indexed {job.project_name} in {time.perf_counter() - start:.1f}s "
+                f"after {indexer.refreshes} progressive refreshes"
+            )
+        except Exception as e:
+            logger.error(f"Error indexing job {job_id}: {str(e)}")
+            job.status = "failed"
+            job.message = f"Error: {str(e)}"
+            job_manager.save_job(job)
+            return {"success": False, "job_id": job_id, "error": str(e)}
+        
+        job.status = "completed"
+        job.completed_at = datetime.now()
+        job.message = f"Completed! {job.file_count} files indexed in {job.project_name}"
+        job_manager.save_job(job)
+        return result
+    finally:
+        job_manager.release_job(job_id)
+
+
+def submit_job(job_id, job_manager=None):
+    """Queue a job for background execution"""
+    job_manager = job_manager or ScrapingJobManager()
+    job = job_manager.load_job(job_id)
+    if job_manager.is_running(job_id):
+        return job
+    
+    pool = get_worker_pool() if APP_CONFIG["job_runner"] == "pool" else None
+    
+    job.status = "pending"
+    job.message = "Waiting for a worker..."
+    job_manager.save_job(job)
+    
+    if pool:
+        pool.submit(run_job, job_id).add_done_callback(_log_failure(job_id))
+    
+    logger.info(f"Job {job_id} submitted ({APP_CONFIG['job_runner']} runner)")
+    return job
+
+
+def _log_failure(job_id):
+    """Build a future callback logging errors that escaped the worker"""
+    def callback(future):
+        error = future.exception()
+        if error:
+            logger.error(f"Worker for job {job_id} failed: {str(error)}")
+    return callback
+
+
+def main():
+    """Run pending jobs in a process pool until interrupted"""
+    job_manager = ScrapingJobManager()
+    running = {}
+    poll_interval = APP_CONFIG["job_poll_interval"]
+    
+    logger.info(f"Job worker started with {APP_CONFIG['worker_processes']} processes")
+    with _create_pool() as pool:
+        try:
+            while True:
+                for job in job_manager.list_jobs(statuses=("pending",)):
+                    if job.id not in running and not job_manager.is_running(job.id):
+                        running[job.id] = pool.submit(run_job, job.id)
+                        running[job.id].add_done_callback(_log_failure(job.id))
+                
+                running = {job_id: future for job_id, future in running.items() if not future.done()}
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            logger.info("Job worker stopping")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 import os
 import logging
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from firecrawl import FirecrawlApp
-import os
 from core.config import APP_CONFIG, PATHS
+from core.collection_catalog import CollectionCatalog
 from core.database import ScrapingProjectManager
-import shutil
+from core.http_client import get_http_session, get_http_timeout
+from core.job_store import ScrapingJobManager
+from core.registry import get_registry
+from core.utils import url_to_filename
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +22,9 @@ class ScrapingService:
         self.api_key = api_key or APP_CONFIG["firecrawl_api_key"]
         self.api_url = api_url or APP_CONFIG["firecrawl_api_url"]
         self.project_manager = ScrapingProjectManager()
+        self.job_manager = ScrapingJobManager()
+        self.session = get_http_session()
+        self.catalog = get_registry().service("collection_catalog", CollectionCatalog)
         
         # Initialize FirecrawlApp
         self.app = FirecrawlApp(api_key=self.api_key, api_url=self.api_url)
@@ -43,12 +50,15 @@ class ScrapingService:
     def fetch_next_data(self, url):
         """Fetch the next chunk of results using the URL 'next'"""
         headers = {"Authorization": f"Bearer {self.api_key}"}
-        response = requests.get(url, headers=headers)
+        response = self.session.get(url, headers=headers, timeout=get_http_timeout())
         response.raise_for_status()
         return response.json()
     
     def batch_scrape_urls(self, links, formats=None):
-        """Scrape a batch of URLs and return the content"""
+        """Scrape a batch of URLs, yielding pages as each chunk of results arrives
+        
+        At most the current chunk of results and the prefetched next one are held in memory.
+        """
         if formats is None:
             formats = ['markdown']
             
@@ -56,104 +66,181 @@ class ScrapingService:
         
         try:
             logger.info(f"Starting batch scrape with {len(links)} links")
-            batch_scrape_result = self.app.batch_scrape_urls(links, scrape_params)
-            
-            # Handle pagination of results
-            all_scrape_data = []
-            response = batch_scrape_result
-            
-            while True:
-                data_chunk = response.get("data", [])
-                all_scrape_data.extend(data_chunk)
-                
-                next_url = response.get("next")
-                if not next_url:
-                    break
+            response = self.app.batch_scrape_urls(links, scrape_params)
+            
+            # Handle pagination of results, fetching the next chunk while this one is consumed
+            total_pages = 0
+            with ThreadPoolExecutor(max_workers=1, thread_name_prefix="scrape-prefetch") as executor:
+                while response is not None:
+                    next_url = response.get("next")
+                    next_response = executor.submit(self.fetch_next_data, next_url) if next_url else None
+                    if next_url:
+                        logger.debug("Prefetching next chunk of results for batch scrape...")
+                    
+                    data_chunk = response.get("data", [])
+                    total_pages += len(data_chunk)
+                    yield from data_chunk
                     
-                logger.debug("Fetching next chunk of results for batch scrape...")
-                response = self.fetch_next_data(next_url)
+                    response = next_response.result() if next_response else None
             
-            logger.info(f"Total scraped pages: {len(all_scrape_data)}")
-            return all_scrape_data
+            logger.info(f"Total scraped pages: {total_pages}")
         except Exception as e:
             logger.error(f"Error during batch scrape: {str(e)}")
             raise
     
-    def save_scraped_content(self, scraped_data, project_name):
-        """Save scraped content to the specified project directory"""
-        # Create output directory
-        output_dir = os.path.join(PATHS["rag_directory"], project_name)
+    def _save_page(self, output_dir, page, idx, written):
+        """Write one scraped page, returning (file_path, changed), or None if it was skipped"""
+        markdown_content = page.get("markdown")
+        if not markdown_content:
+            logger.warning(f"Page {idx} does not contain markdown content. Skipping.")
+            return None
         
-        # If directory exists, delete it first
-        if os.path.exists(output_dir):
-            shutil.rmtree(output_dir)
-            
-        os.makedirs(output_dir, exist_ok=True)
-        logger.info(f"Created output directory: {output_dir}")
+        # Name files after their URL so a page keeps its file (and its vectors) across re-scrapes
+        metadata = page.get("metadata") or {}
+        source_url = metadata.get("sourceURL") or metadata.get("url")
+        filename = url_to_filename(source_url) if source_url else f"{idx}.md"
+        if filename in written:
+            filename = f"{filename[:-3]}_{idx}.md"
+        written.add(filename)
         
-        saved_files = 0
-        for idx, page in enumerate(scraped_data, start=1):
-            markdown_content = page.get("markdown")
-            if not markdown_content:
-                logger.warning(f"Page {idx} does not contain markdown content. Skipping.")
-                continue
-                
-            file_path = os.path.join(output_dir, f"{idx}.md")
-            try:
+        file_path = os.path.join(output_dir, filename)
+        try:
+            # Leave unchanged pages untouched so the index does not re-read them
+            if os.path.exists(file_path):
+                with open(file_path, "r", encoding="utf-8") as file:
+                    changed = file.read() != markdown_content
+            else:
+                changed = True
+            
+            if changed:
                 with open(file_path, "w", encoding="utf-8") as file:
                     file.write(markdown_content)
                 logger.info(f"File saved successfully: {file_path}")
-                saved_files += 1
-            except Exception as e:
-                logger.error(f"Error saving file {file_path}: {str(e)}")
+            return file_path, changed
+        except Exception as e:
+            logger.error(f"Error saving file {file_path}: {str(e)}")
+            return None
     
-    def run_full_scraping_process(self, url, project_name, progress_callback=None):
-        """Run the complete scraping process for a URL"""
-        try:
-            # Update progress
-            if progress_callback:
-                progress_callback(0.1, "Mapping URL to extract links...")
-            
-            # Map URL to extract links
-            links = self.map_url(url)
-            
-            # Update progress
-            if progress_callback:
-                progress_callback(0.3, f"Found {len(links)} links. Starting scraping...")
-            
-            # Scrape links
-            scraped_data = self.batch_scrape_urls(links)
-            
-            # Update progress
+    def _remove_stale_files(self, output_dir, keep):
+        """Remove pages that are no longer part of the site"""
+        for filename in os.listdir(output_dir):
+            if filename.endswith(".md") and filename not in keep:
+                os.remove(os.path.join(output_dir, filename))
+                logger.info(f"Removed stale file: {filename}")
+    
+    def run_scraping_job(self, job, progress_callback=None, on_file_saved=None, complete=True):
+        """Run a scraping job, resuming from its last checkpoint
+        
+        The mapped link list and every completed URL are checkpointed, so a job
+        interrupted by a crash or a browser refresh skips the MAP step and the pages
+        it already saved when it is run again. With ``complete=False`` the job is left
+        in the "scraped" status for a later pipeline stage (indexing) to finish.
+        """
+        def report(message):
+            job.message = message
+            self.job_manager.save_job(job)
             if progress_callback:
-                progress_callback(0.8, f"Scraped {len(scraped_data)} pages. Saving content...")
-            
-            # Save content
-            saved_files = self.save_scraped_content(scraped_data, project_name)
+                progress_callback(job.progress, message)
+        
+        try:
+            links = self.job_manager.load_links(job.id)
+            if links is None:
+                job.status = "mapping"
+                job.progress = 0.05
+                report("Mapping URL to extract links...")
+                
+                links = self.map_url(job.url)
+                self.job_manager.save_links(job.id, links)
+            
+            output_dir = os.path.join(PATHS["rag_directory"], job.project_name)
+            os.makedirs(output_dir, exist_ok=True)
+            
+            completed = self.job_manager.load_completed(job.id)
+            written = {filename for filename in completed.values() if filename}
+            remaining = [link for link in links if link not in completed]
+            
+            job.status = "scraping"
+            job.total_urls = len(links)
+            job.completed_urls = len(links) - len(remaining)
+            job.progress = self._job_progress(job)
+            if job.completed_urls:
+                report(f"Resuming: {job.completed_urls} of {len(links)} URLs already scraped...")
+            else:
+                report(f"Found {len(links)} links. Starting scraping...")
+            
+            # Scrape in small batches so an interruption loses at most one batch
+            batch_size = APP_CONFIG["scrape_batch_size"]
+            for start in range(0, len(remaining), batch_size):
+                batch = remaining[start:start + batch_size]
+                pending = set(batch)
+                
+                for page in self.batch_scrape_urls(batch):
+                    metadata = page.get("metadata") or {}
+                    source_url = metadata.get("sourceURL") or metadata.get("url") or ""
+                    
+                    saved_page = self._save_page(output_dir, page, len(completed) + 1, written)
+                    filename = os.path.basename(saved_page[0]) if saved_page else ""
+                    self.job_manager.mark_completed(job.id, source_url, filename)
+                    completed[source_url] = filename
+                    
+                    if source_url in pending:
+                        pending.discard(source_url)
+                        job.completed_urls += 1
+                        job.progress = self._job_progress(job)
+                        report(f"Scraped {job.completed_urls} of {job.total_urls} URLs...")
+                    
+                    if saved_page and on_file_saved:
+                        on_file_saved(saved_page[0], saved_page[1])
+                
+                # URLs without a page of their own (failed or redirected) are done too
+                if pending:
+                    for link in pending:
+                        self.job_manager.mark_completed(job.id, link)
+                        completed[link] = ""
+                    job.completed_urls += len(pending)
+                    job.progress = self._job_progress(job)
+                    report(f"Scraped {job.completed_urls} of {job.total_urls} URLs...")
+            
+            self._remove_stale_files(output_dir, written)
+            self.catalog.refresh(job.project_name)
             
             # Save project record
             self.project_manager.save_project(
-                project_name=project_name,
-                source_url=url,
-                file_count=saved_files
+                project_name=job.project_name,
+                source_url=job.url,
+                file_count=len(written)
             )
             
-            # Update progress
-            if progress_callback:
-                progress_callback(1.0, f"Completed! Saved {saved_files} files to {project_name}")
+            job.file_count = len(written)
+            job.progress = 1.0
+            if complete:
+                job.status = "completed"
+                job.completed_at = datetime.now()
+                report(f"Completed! Saved {len(written)} files to {job.project_name}")
+            else:
+                job.status = "scraped"
+                report(f"Scraped {len(written)} files to {job.project_name}")
             
             return {
                 "success": True,
-                "project_name": project_name,
-                "url": url,
-                "files_saved": saved_files
+                "job_id": job.id,
+                "project_name": job.project_name,
+                "url": job.url,
+                "files_saved": len(written)
             }
             
         except Exception as e:
-            logger.error(f"Error in scraping process: {str(e)}")
-            if progress_callback:
-                progress_callback(1.0, f"Error: {str(e)}")
+            logger.error(f"Error in scraping job {job.id}: {str(e)}")
+            job.status = "failed"
+            report(f"Error: {str(e)}")
             return {
                 "success": False,
+                "job_id": job.id,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+    
+    def _job_progress(self, job):
+        """Overall progress of a job: mapping first, then one step per URL"""
+        if not job.total_urls:
+            return 0.1
+        return 0.1 + 0.9 * job.completed_urls / job.total_urls